@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Compares save() and asave() inside an asyncio server loop.
+
+--clients coroutines each handle --requests requests, one update of an
+object followed by a save. With save() the event loop is blocked for the
+whole write; with asave() the write runs in the executor and concurrent
+requests share it. A probe task sleeps 1 ms in a loop and records how
+late it wakes up, which is the delay any other request would see.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from benchmarks.common import make_objects
+from models.base_model import BaseModel
+from models.engine.file_storage import FileStorage
+
+
+async def serve(storage, objects, clients, requests, use_async):
+    """Returns (request latencies, probe delays, seconds) of one run"""
+    latencies, delays = [], []
+    done = asyncio.Event()
+
+    async def client(slot):
+        for i in range(requests):
+            start = time.perf_counter()
+            storage.mark_dirty(objects[(slot * requests + i) % len(objects)])
+            if use_async:
+                await storage.asave()
+            else:
+                storage.save()
+                await asyncio.sleep(0)
+            latencies.append(time.perf_counter() - start)
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            delays.append(time.perf_counter() - start - 0.001)
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(client(slot) for slot in range(clients)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+    return latencies, delays, elapsed
+
+
+def percentile(values, fraction):
+    """Returns the value below which fraction of values fall"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    """Parses the arguments and prints one table row per mode"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=10000)
+    parser.add_argument("-c", "--clients", type=int, default=50)
+    parser.add_argument("-r", "--requests", type=int, default=20)
+    args = parser.parse_args()
+    objects = make_objects(BaseModel, args.count)
+    print(f"{args.count} objects, {args.clients} clients x "
+          f"{args.requests} requests, fsync on every write")
+    print(f"{'mode':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'probe p99':>10} {'writes':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file.json")
+        for use_async in (False, True):
+            storage = FileStorage(file_path=path, durability="file")
+            for obj in objects:
+                storage.new(obj)
+            storage.compact()
+            latencies, delays, elapsed = asyncio.run(
+                serve(storage, objects, args.clients, args.requests,
+                      use_async))
+            writes = (storage.async_stats()["writes"] if use_async
+                      else len(latencies))
+            print(f"{'async' if use_async else 'sync':>6} "
+                  f"{len(latencies) / elapsed:8.0f} "
+                  f"{statistics.median(latencies) * 1000:8.2f} "
+                  f"{percentile(latencies, 0.99) * 1000:8.2f} "
+                  f"{percentile(delays or [0], 0.99) * 1000:10.2f} "
+                  f"{writes:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Measures the throughput of storage.bulk_insert().
+
+For each size, --sizes rows of User attributes are inserted into a fresh
+JSON store and a fresh SQLite store with one bulk_insert() call, which
+builds, registers and persists them. For sizes up to --naive, the same
+rows are also inserted one object at a time with a save after each, as
+creating them through BaseModel() and save() does.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.user import User
+
+
+def rows(count):
+    """Returns count rows of User attributes"""
+    return [{"email": f"user{i}@hbnb.io", "first_name": "Ada",
+             "last_name": f"Lovelace {i}"} for i in range(count)]
+
+
+def json_store(directory):
+    """Returns an empty JSON store in directory"""
+    return FileStorage(file_path=os.path.join(directory, "file.json"))
+
+
+def sqlite_store(directory):
+    """Returns an empty SQLite store in directory"""
+    storage = DBStorage(os.path.join(directory, "file.db"))
+    storage.reload()
+    return storage
+
+
+def bulk(storage, data):
+    """Inserts data with one bulk_insert() call"""
+    storage.bulk_insert(User, data)
+
+
+def one_by_one(storage, data):
+    """Inserts data one object at a time, saving after each"""
+    for obj in User._new_many(data):
+        storage.new(obj)
+        storage.save()
+
+
+def main():
+    """Parses the arguments and prints one table row per size and method"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-s", "--sizes", type=int, nargs="+",
+                        default=[10000, 100000, 1000000])
+    parser.add_argument("--naive", type=int, default=10000)
+    args = parser.parse_args()
+    print(f"{'rows':>8} {'engine':>6} {'method':>11} {'seconds':>8} "
+          f"{'rows/s':>9}")
+    for size in args.sizes:
+        data = rows(size)
+        methods = [("bulk", bulk)]
+        if size <= args.naive:
+            methods.append(("one-by-one", one_by_one))
+        for label, insert in methods:
+            for engine, open_store in (("json", json_store),
+                                       ("sqlite", sqlite_store)):
+                with tempfile.TemporaryDirectory() as directory:
+                    storage = open_store(directory)
+                    start = time.perf_counter()
+                    insert(storage, data)
+                    elapsed = time.perf_counter() - start
+                    del storage
+                print(f"{size:>8} {engine:>6} {label:>11} {elapsed:8.2f} "
+                      f"{size / elapsed:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
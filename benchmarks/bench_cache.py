@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Measures the bounded instance cache of DBStorage.
+
+A database of --count objects is read with --lookups get() calls, 80% of
+them on a hot 10% of the ids. For each cache size the script reports the
+lookup rate, the hit rate, the evictions, the instances left in memory
+and the memory they hold (traced in a second, untimed pass).
+"""
+
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from benchmarks.common import make_objects
+from models.base_model import BaseModel
+from models.engine.db_storage import DBStorage
+
+
+def workload(ids, lookups):
+    """Returns the ids to look up, 80% of them from the first tenth of ids"""
+    rng = random.Random(0)
+    hot = ids[:max(1, len(ids) // 10)]
+    return [rng.choice(hot) if rng.random() < 0.8 else rng.choice(ids)
+            for _ in range(lookups)]
+
+
+def run(path, cache_size, keys):
+    """Returns the storage after looking up keys in a fresh one"""
+    storage = DBStorage(path, cache_size=cache_size)
+    storage.reload()
+    for obj_id in keys:
+        storage.get(BaseModel, obj_id)
+    return storage
+
+
+def main():
+    """Parses the arguments and prints one table row per cache size"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    parser.add_argument("-l", "--lookups", type=int, default=200000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file.db")
+        storage = DBStorage(path)
+        storage.reload()
+        objects = make_objects(BaseModel, args.count, name="object")
+        for obj in objects:
+            storage.new(obj)
+        storage.save()
+        ids = [obj.id for obj in objects]
+        del storage, objects
+        keys = workload(ids, args.lookups)
+        print(f"{args.count} rows, {args.lookups} lookups")
+        print(f"{'cache':>8} {'lookups/s':>10} {'hit rate':>9} "
+              f"{'evictions':>10} {'resident':>9} {'MiB':>7}")
+        for cache_size in (None, 100000, 10000, 1000):
+            start = time.perf_counter()
+            stats = run(path, cache_size, keys).cache_stats()
+            elapsed = time.perf_counter() - start
+            gc.collect()
+            tracemalloc.start()
+            storage = run(path, cache_size, keys)
+            gc.collect()
+            size = tracemalloc.get_traced_memory()[0] / 2 ** 20
+            tracemalloc.stop()
+            del storage
+            label = "none" if cache_size is None else str(cache_size)
+            print(f"{label:>8} {len(keys) / elapsed:10.0f} "
+                  f"{stats['hit_rate']:9.1%} {stats['evictions']:>10} "
+                  f"{stats['resident']:>9} {size:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
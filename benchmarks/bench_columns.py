@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Compares a Place aggregate over the columnar side file with a scan.
+
+For each dataset size the script saves a store of Places, then reports
+the time of the mean price_by_night computed three ways: by reloading
+the store and scanning the instances, by scanning the instances already
+in memory, and over the memory-mapped side file. The first columns()
+call, which writes the side file, is reported on its own.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from benchmarks.common import make_objects
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def seconds(func):
+    """Returns the wall-clock time of one call of func"""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    """Builds the datasets and prints one table row per size"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sizes", nargs="*", type=int,
+                        default=[10000, 100000])
+    args = parser.parse_args()
+    rng = random.Random(0)
+    print(f"{'places':>9} {'reload+scan s':>14} {'scan s':>8} "
+          f"{'write s':>8} {'mmap s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"{size}.json")
+            storage = FileStorage(file_path=path)
+            for place in make_objects(Place, size):
+                place.price_by_night = rng.randrange(20, 500)
+                storage.new(place)
+            storage.save()
+
+            def scan(store=storage):
+                places = store.all(Place).values()
+                return sum(p.price_by_night for p in places) / len(places)
+
+            def reload_and_scan():
+                loaded = FileStorage(file_path=path)
+                loaded.reload()
+                return scan(loaded)
+
+            def mapped():
+                with storage.columns(Place) as columns:
+                    return columns.stats("price_by_night")["mean"]
+            print(f"{size:>9} {seconds(reload_and_scan):14.3f} "
+                  f"{seconds(scan):8.3f} {seconds(mapped):8.3f} "
+                  f"{seconds(mapped):8.3f}")
+
+
+if __name__ == "__main__":
+    main()
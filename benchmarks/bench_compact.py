@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Reports the memory of one model instance, regular vs compact.
+
+For each class, --count instances are built from records holding every
+declared field, as reload() builds them. The traced memory they add is
+divided by the count. Regular instances are measured right after they
+are built and again once to_dict() has run on them, which happens on the
+first save: it materializes their __dict__ and caches the serialized
+dict, which compact instances do not. The values themselves are built
+before the measure, except created_at/updated_at.
+"""
+
+import argparse
+import gc
+import tracemalloc
+import uuid
+from models.compact import compact
+from models.engine.file_storage import FileStorage
+
+
+def records(klass, count):
+    """Returns count records of klass with every declared field set"""
+    now = "2024-05-21T09:52:28.980961"
+    fields = {name: value for name, value in vars(klass).items()
+              if not name.startswith("_") and not callable(value)}
+    return [dict(fields, id=str(uuid.uuid4()), created_at=now,
+                 updated_at=now) for _ in range(count)]
+
+
+def per_object(build, rows, touch=False):
+    """Returns the traced bytes per instance built by build from rows"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(**row) for row in rows]
+    if touch:
+        for obj in objects:
+            obj.to_dict()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size / len(rows)
+
+
+def main():
+    """Parses the arguments and prints one table row per class"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    args = parser.parse_args()
+    print(f"bytes per object, {args.count} objects per class")
+    print(f"{'class':>10} {'regular':>8} {'+to_dict':>9} {'compact':>8} "
+          f"{'saved':>6}")
+    for name, klass in FileStorage().classes().items():
+        rows = records(klass, args.count)
+        regular = per_object(klass, rows)
+        touched = per_object(klass, rows, touch=True)
+        small = per_object(compact(klass), rows, touch=True)
+        print(f"{name:>10} {regular:8.0f} {touched:9.0f} {small:8.0f} "
+              f"{1 - small / touched:6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Reports the size and CPU cost of each snapshot compression level.
+
+A store of Users and Places is written once per format (JSON, binary),
+compression and level. For each combination the script prints the file
+size, the compression ratio and the CPU time of one compact() and of one
+reload() that builds every instance.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.common import make_objects
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.user import User
+
+SETTINGS = [("none", None), ("zlib", 1), ("zlib", 6), ("zlib", 9),
+            ("lzma", 0), ("lzma", 3), ("lzma", 6)]
+
+
+def cpu(func):
+    """Returns the CPU time (user + system) spent in func, in seconds"""
+    start = time.process_time()
+    func()
+    return time.process_time() - start
+
+
+def bench(objects, path, compression, level):
+    """Returns (bytes, save CPU s, load CPU s) of one setting"""
+    storage = FileStorage(file_path=path, compression=compression,
+                          compress_level=level)
+    for obj in objects:
+        storage.new(obj)
+    save_time = cpu(storage.compact)
+
+    def load():
+        FileStorage(file_path=path, compression=compression).reload()
+    load_time = cpu(load)
+    size = os.path.getsize(path)
+    os.remove(path)
+    return size, save_time, load_time
+
+
+def main():
+    """Builds the dataset and prints one table row per setting"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    args = parser.parse_args()
+    objects = (make_objects(User, args.count // 2, email="a@b.c",
+                            first_name="Betty", last_name="Bar")
+               + make_objects(Place, args.count - args.count // 2,
+                              city_id="c1", name="Flat", price_by_night=80,
+                              latitude=48.85, longitude=2.35))
+    print(f"{args.count} objects")
+    print(f"{'format':>6} {'codec':>5} {'level':>5} {'MB':>7} {'ratio':>6} "
+          f"{'save cpu s':>10} {'load cpu s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for suffix in (".json", ".bin"):
+            path = os.path.join(directory, f"snapshot{suffix}")
+            baseline = None
+            for compression, level in SETTINGS:
+                size, save_time, load_time = bench(objects, path,
+                                                   compression, level)
+                baseline = baseline or size
+                print(f"{suffix[1:]:>6} {compression:>5} "
+                      f"{'-' if level is None else level:>5} "
+                      f"{size / 1e6:7.2f} {baseline / size:6.1f} "
+                      f"{save_time:10.3f} {load_time:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Reports the latency of FileStorage.save() at each durability level.
+
+Each run registers the objects, writes one full snapshot and then times a
+single-object update followed by save(), which is what the console does.
+"""
+
+import argparse
+import os
+import tempfile
+from benchmarks.common import make_objects, timed
+from models.base_model import BaseModel
+from models.engine.file_storage import DURABILITY_LEVELS, FileStorage
+
+
+def bench(count, durability, journal, directory):
+    """Returns the best time of one update + save for the given settings"""
+    path = os.path.join(directory, f"{durability}-{journal}.json")
+    storage = FileStorage(file_path=path, journal=journal,
+                          compact_after=10 ** 9, durability=durability)
+    objects = make_objects(BaseModel, count)
+    for obj in objects:
+        storage.new(obj)
+    storage.compact()
+
+    def update():
+        storage.mark_dirty(objects[0])
+        storage.save()
+    return timed(update, repeat=20)
+
+
+def main():
+    """Parses the arguments and prints one line per setting"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=10000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{args.count} objects, one update + save():")
+        for journal in (False, True):
+            for durability in DURABILITY_LEVELS:
+                seconds = bench(args.count, durability, journal, directory)
+                mode = "journal " if journal else "snapshot"
+                print(f"  {mode} durability={durability:<4} "
+                      f"{seconds * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Compares synchronous saves with the group-commit background writer.
+
+A store of objects receives a burst of update + save() calls, one every
+--gap milliseconds (the work a request does between saves). For each
+setting the script reports the average time a save() call blocks its
+caller, the total time until everything is on disk (including flush())
+and how many snapshot writes the burst cost.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.common import make_objects
+from models.base_model import BaseModel
+from models.engine.file_storage import FileStorage
+
+
+def bench(objects, saves, gap, window, path):
+    """Returns (ms per save() call, total s, writes) of one setting"""
+    storage = FileStorage(file_path=path, group_commit=window)
+    for obj in objects:
+        storage.new(obj)
+    storage.compact()
+    blocked = 0.0
+    start = time.perf_counter()
+    for i in range(saves):
+        time.sleep(gap)
+        storage.mark_dirty(objects[i % len(objects)])
+        before = time.perf_counter()
+        storage.save()
+        blocked += time.perf_counter() - before
+    storage.flush()
+    total = time.perf_counter() - start
+    stats = storage.commit_stats()
+    storage.close()
+    return (blocked / saves * 1000, total,
+            saves if stats is None else stats["writes"])
+
+
+def main():
+    """Parses the arguments and prints one table row per setting"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=10000)
+    parser.add_argument("-s", "--saves", type=int, default=200)
+    parser.add_argument("-g", "--gap", type=float, default=0.5)
+    args = parser.parse_args()
+    objects = make_objects(BaseModel, args.count)
+    print(f"{args.count} objects, {args.saves} saves "
+          f"{args.gap:g} ms apart")
+    print(f"{'window':>10} {'ms/save()':>10} {'total s':>8} {'writes':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file.json")
+        for window in (None, 0.001, 0.005, 0.02):
+            blocked, total, writes = bench(objects, args.saves,
+                                           args.gap / 1000, window, path)
+            label = "sync" if window is None else f"{window * 1000:g} ms"
+            print(f"{label:>10} {blocked:10.3f} {total:8.3f} {writes:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Compares refresh() with a full reload() when another process saved.
+
+Two storages share one journaled store. After the writer saves a single
+update, the script times how long the reader takes to catch up with
+refresh() (which reads the journal from its last offset), how long a
+refresh() takes when nothing changed (a stat() per file) and how long a
+full reload() into an empty storage takes.
+"""
+
+import argparse
+import os
+import tempfile
+from benchmarks.common import make_objects, timed
+from models.base_model import BaseModel
+from models.engine.file_storage import FileStorage
+
+
+def main():
+    """Parses the arguments and prints one line per operation"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    args = parser.parse_args()
+    objects = make_objects(BaseModel, args.count)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file.json")
+        writer = FileStorage(file_path=path, journal=True, shared=True,
+                             compact_after=10 ** 9)
+        for obj in objects:
+            writer.new(obj)
+        writer.compact()
+        reader = FileStorage(file_path=path, journal=True, shared=True,
+                             compact_after=10 ** 9)
+        reader.reload()
+        updates = iter(objects)
+
+        def update():
+            obj = next(updates)
+            obj.updated_at = obj.updated_at.replace(microsecond=1)
+            writer.mark_dirty(obj)
+            writer.save()
+
+        def catch_up():
+            update()
+            reader.refresh()
+
+        def full():
+            storage = FileStorage(file_path=path, journal=True)
+            storage.reload()
+
+        print(f"{args.count} objects")
+        print(f"{'save one update':>24} {timed(update) * 1000:9.3f} ms")
+        print(f"{'save + refresh()':>24} {timed(catch_up) * 1000:9.3f} ms")
+        print(f"{'refresh(), no change':>24} "
+              f"{timed(reader.refresh) * 1000:9.3f} ms")
+        print(f"{'full reload()':>24} {timed(full, 3) * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Compares the JSON and binary snapshot formats of FileStorage.
+
+For each dataset size the script fills a store with Users and Places,
+then reports the time of a full snapshot write (compact()), the time of
+a reload() that builds every instance, and the size of the file.
+"""
+
+import argparse
+import os
+import tempfile
+from benchmarks.common import make_objects, timed
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.user import User
+
+
+def bench(objects, path):
+    """Returns (save s, load s, bytes) of one snapshot format"""
+    storage = FileStorage(file_path=path)
+    for obj in objects:
+        storage.new(obj)
+
+    def save():
+        storage._FileStorage__fragments.clear()
+        storage.compact()
+
+    def load():
+        FileStorage(file_path=path).reload()
+    save_time = timed(save, repeat=3)
+    load_time = timed(load, repeat=3)
+    return save_time, load_time, os.path.getsize(path)
+
+
+def main():
+    """Builds the datasets and prints one table row per size and format"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sizes", nargs="*", type=int,
+                        default=[10000, 100000])
+    args = parser.parse_args()
+    print(f"{'objects':>8} {'format':>7} {'save s':>8} {'load s':>8} "
+          f"{'MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            objects = (make_objects(User, size // 2, email="a@b.c",
+                                    first_name="Betty", last_name="Bar")
+                       + make_objects(Place, size - size // 2, city_id="c1",
+                                      name="Flat", price_by_night=80,
+                                      latitude=48.85, longitude=2.35))
+            for suffix in (".json", ".bin"):
+                path = os.path.join(directory, f"snapshot{suffix}")
+                save_time, load_time, size_bytes = bench(objects, path)
+                print(f"{size:>8} {suffix[1:]:>7} {save_time:8.3f} "
+                      f"{load_time:8.3f} {size_bytes / 1e6:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
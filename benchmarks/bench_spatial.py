@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Compares the Place grid index against a linear haversine scan.
+
+Each dataset size is built twice: with points spread uniformly over a
+20 x 40 degree region (roughly the size of Europe), and with the points
+clustered around Lagos, far from the queries. The queries are drawn
+from the European region. For each dataset the script reports the
+average time of a 5 km radius query, a 0.2 degree bounding box and a
+10-nearest lookup, with and without the index.
+"""
+
+import argparse
+import heapq
+import random
+import time
+from models.engine.indexes import GridIndex, haversine
+
+SOUTH, NORTH, WEST, EAST = 35.0, 55.0, -10.0, 30.0
+LAGOS = (6.5244, 3.3792)
+
+
+def uniform(rng):
+    """Returns a point of the European region"""
+    return rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+
+
+def clustered(rng):
+    """Returns a point within about a degree of Lagos"""
+    return rng.gauss(LAGOS[0], 0.3), rng.gauss(LAGOS[1], 0.3)
+
+
+def average(func, queries):
+    """Returns the mean time of func over the query points, in ms"""
+    start = time.perf_counter()
+    for lat, lon in queries:
+        func(lat, lon)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    """Builds the datasets and prints one table row per size"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sizes", nargs="*", type=int,
+                        default=[100000, 1000000])
+    parser.add_argument("-q", "--queries", type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    print(f"{'places':>9} {'layout':>9} {'build s':>8} {'query':>8} "
+          f"{'grid ms':>9} {'scan ms':>10}")
+    for size, layout in [(size, layout) for size in args.sizes
+                         for layout in (uniform, clustered)]:
+        points = [(f"Place.{i}", *layout(rng)) for i in range(size)]
+        start = time.perf_counter()
+        index = GridIndex()
+        for key, lat, lon in points:
+            index.update(key, (lat, lon))
+        build = time.perf_counter() - start
+        queries = [(rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST))
+                   for _ in range(args.queries)]
+
+        def scan_radius(lat, lon):
+            return sorted((d, key) for key, plat, plon in points
+                          if (d := haversine(lat, lon, plat, plon)) <= 5)
+
+        def scan_box(lat, lon):
+            return [key for key, plat, plon in points
+                    if lat <= plat <= lat + 0.2 and lon <= plon <= lon + 0.2]
+
+        def scan_nearest(lat, lon):
+            return heapq.nsmallest(10, ((haversine(lat, lon, plat, plon), key)
+                                        for key, plat, plon in points))
+
+        rows = [
+            ("radius", lambda lat, lon: index.within_radius(lat, lon, 5),
+             scan_radius),
+            ("box", lambda lat, lon: index.within_box(lat, lon, lat + 0.2,
+                                                      lon + 0.2), scan_box),
+            ("knn-10", lambda lat, lon: index.nearest(lat, lon, 10),
+             scan_nearest),
+        ]
+        for name, grid, scan in rows:
+            print(f"{size:>9} {layout.__name__:>9} {build:>8.2f} {name:>8} "
+                  f"{average(grid, queries):>9.3f} "
+                  f"{average(scan, queries):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Measures query throughput of FileStorage from several threads.
+
+Reader threads run get() and count() lookups for --duration seconds
+while, optionally, another thread keeps updating an object and calling
+save(). The default storage serializes everything behind one lock; with
+thread_safe=True queries share a reader/writer lock and save() only
+holds it while encoding, not while writing the file.
+
+CPython runs one thread of Python code at a time, so pure lookups do not
+scale with the thread count. What the reader/writer lock buys is that
+queries keep running while a save is on the disk.
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from benchmarks.common import make_objects
+from models.base_model import BaseModel
+from models.engine.file_storage import FileStorage
+
+
+def bench(objects, threads, saving, thread_safe, duration, path):
+    """Returns (queries per second, saves) of one setting"""
+    storage = FileStorage(file_path=path, thread_safe=thread_safe,
+                          durability="file")
+    for obj in objects:
+        storage.new(obj)
+    storage.compact()
+    ids = [obj.id for obj in objects]
+    stop = threading.Event()
+    counts = [0] * threads
+    saves = 0
+
+    def read(slot):
+        done = 0
+        while not stop.is_set():
+            for obj_id in ids[done % len(ids):done % len(ids) + 100]:
+                storage.get(BaseModel, obj_id)
+            storage.count(BaseModel)
+            done += 100
+        counts[slot] = done
+
+    def save():
+        nonlocal saves
+        while not stop.is_set():
+            storage.mark_dirty(objects[saves % len(objects)])
+            storage.save()
+            saves += 1
+
+    workers = [threading.Thread(target=read, args=(slot,))
+               for slot in range(threads)]
+    if saving:
+        workers.append(threading.Thread(target=save))
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / duration, saves
+
+
+def main():
+    """Parses the arguments and prints one table row per setting"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=10000)
+    parser.add_argument("-d", "--duration", type=float, default=2.0)
+    args = parser.parse_args()
+    objects = make_objects(BaseModel, args.count)
+    print(f"{args.count} objects, {args.duration:g} s per setting")
+    print(f"{'lock':>10} {'saver':>6} {'threads':>7} "
+          f"{'queries/s':>10} {'saves':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file.json")
+        for saving in (False, True):
+            for thread_safe in (False, True):
+                for threads in (1, 2, 4, 8):
+                    rate, saves = bench(objects, threads, saving,
+                                        thread_safe, args.duration, path)
+                    label = "rw" if thread_safe else "exclusive"
+                    print(f"{label:>10} {'yes' if saving else 'no':>6} "
+                          f"{threads:>7} {rate:10.0f} {saves:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Compares datetime and epoch timestamps when saving and reloading.
+
+A store of --count objects is written once, as a JSON and as a binary
+snapshot. For each snapshot format and timestamp mode the script reports
+the time of a reload, of a full save of the reloaded objects (compact(),
+which passes every object through to_dict()) and of a full save after
+updated_at was set on every object, as save() does.
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+from benchmarks.common import make_objects
+from models import timestamps
+from models.base_model import BaseModel
+from models.engine.file_storage import FileStorage
+
+
+def timed(func):
+    """Returns the wall-clock time of one call of func"""
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(path):
+    """Returns the (reload, save, update and save) times of a store"""
+    storage = FileStorage(file_path=path)
+    reload = timed(storage.reload)
+    save = timed(storage.compact)
+    for obj in storage.all().values():
+        obj.updated_at = timestamps.now()
+        storage.mark_dirty(obj, "updated_at")
+    update = timed(storage.compact)
+    return reload, save, update
+
+
+def main():
+    """Parses the arguments and prints one table row per format and mode"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=1000000)
+    args = parser.parse_args()
+    print(f"{args.count} objects, seconds")
+    print(f"{'format':>6} {'timestamps':>10} {'reload':>7} {'save':>7} "
+          f"{'update':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for suffix in ("", ".bin"):
+            path = os.path.join(directory, "file.json" + suffix)
+            storage = FileStorage(file_path=path)
+            for obj in make_objects(BaseModel, args.count, name="object"):
+                storage.new(obj)
+            storage.compact()
+            del storage
+            for epoch in (False, True):
+                timestamps.enable(epoch)
+                reload, save, update = run(path)
+                print(f"{'binary' if suffix else 'json':>6} "
+                      f"{'epoch' if epoch else 'datetime':>10} "
+                      f"{reload:7.2f} {save:7.2f} {update:7.2f}")
+            timestamps.enable(False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Measures the to_dict() cache of the models.
+
+For --count Place objects the script reports the cost of one to_dict()
+call with the cache dropped before each call and with the cache warm,
+then the time of a reload followed by the first full save, for a JSON
+store and a SQLite one. Objects loaded from storage cache their record,
+so that first save does not format their timestamps again.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.common import make_objects, timed
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def serialize(objects, cold):
+    """Calls to_dict() on every object, dropping its cache first if cold"""
+    for obj in objects:
+        if cold:
+            obj._serialized = None
+        obj.to_dict()
+
+
+def reload_and_save(storage, rewrite):
+    """Returns the seconds of a reload and a full save of storage"""
+    start = time.perf_counter()
+    storage.reload()
+    rewrite(storage)
+    return time.perf_counter() - start
+
+
+def mark_all(storage):
+    """Marks every object of a SQLite store dirty and saves it"""
+    for obj in storage.all().values():
+        storage.mark_dirty(obj)
+    storage.save()
+
+
+def main():
+    """Parses the arguments and prints the measures"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    args = parser.parse_args()
+    objects = make_objects(Place, args.count, name="Loft", city_id="c1",
+                           number_rooms=2, latitude=1.5)
+    print(f"{args.count} objects")
+    for cold in (True, False):
+        seconds = timed(lambda: serialize(objects, cold))
+        print(f"to_dict() {'uncached' if cold else 'cached':>9}: "
+              f"{seconds / args.count * 1e6:6.2f} us/object")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file.json")
+        storage = FileStorage(file_path=path)
+        for obj in objects:
+            storage.new(obj)
+        storage.compact()
+        storage = FileStorage(file_path=path)
+        seconds = reload_and_save(storage, FileStorage.compact)
+        print(f"json   reload + save: {seconds:6.2f} s")
+        storage = DBStorage(os.path.join(directory, "file.db"))
+        storage.reload()
+        for obj in objects:
+            storage.new(obj)
+        storage.save()
+        storage = DBStorage(os.path.join(directory, "file.db"))
+        print(f"sqlite reload + save: "
+              f"{reload_and_save(storage, mark_all):6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Helpers shared by the storage benchmarks.
+
+Run the benchmarks from the repository root, for example:
+    python3 -m benchmarks.bench_durability
+"""
+
+import time
+import uuid
+from datetime import datetime
+
+
+def make_objects(cls, count, **attributes):
+    """
+    Builds count instances of cls without registering them in models.storage.
+
+    Args:
+        cls (type): The model class to instantiate.
+        count (int): The number of instances.
+        **attributes: Extra attributes given to every instance.
+
+    Returns:
+        list: The new instances.
+    """
+    now = datetime.now().isoformat()
+    return [cls(id=str(uuid.uuid4()), created_at=now, updated_at=now,
+                **attributes)
+            for _ in range(count)]
+
+
+def timed(func, repeat=5):
+    """
+    Runs func repeat times and returns the best wall-clock time.
+
+    Args:
+        func (callable): The code to measure.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The fastest run, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
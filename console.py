@@ -15,6 +15,7 @@ from models.city import City
 from models.amenity import Amenity
 from models.place import Place
 from models.review import Review
+from models.schema import schema
 
 class HBNBCommand(cmd.Cmd):
     """
@@ -45,6 +46,13 @@ class HBNBCommand(cmd.Cmd):
         print()
         return True
 
+    def precmd(self, line):
+        """
+        Loads the changes other processes saved before running a command.
+        """
+        storage.refresh()
+        return line
+
     def emptyline(self):
         """
         Overrides the default behavior of repeating the last command on an empty line.
@@ -60,7 +68,7 @@ class HBNBCommand(cmd.Cmd):
         elif slit_agrs[0] not in self.classes:
             print('** class doesn\'t exist **')
         else:
-            new_instance = self.classes[slit_agrs[0]]()
+            new_instance = storage.classes()[slit_agrs[0]]()
             new_instance.save()
             print(new_instance.id)
 
@@ -80,11 +88,11 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = f"{args[0]}.{args[1]}"
-        try:
-            print(storage.all()[key])
-        except KeyError:
+        obj = storage.get(args[0], args[1])
+        if obj is None:
             print("** no instance found **")
+        else:
+            print(obj)
 
     def do_destroy(self, arg):
         """
@@ -102,10 +110,9 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = f"{args[0]}.{args[1]}"
-        objs = storage.all()
-        if key in objs:
-            del objs[key]
+        obj = storage.get(args[0], args[1])
+        if obj is not None:
+            storage.delete(obj)
             storage.save()
         else:
             print("** no instance found **")
@@ -116,16 +123,14 @@ class HBNBCommand(cmd.Cmd):
         Usage: all or all <class name>
         """
         args = arg.split()
-        objs = storage.all()
         if len(args) == 0:
-            for obj in objs.values():
+            for obj in storage.all().values():
                 print(obj)
         elif args[0] not in self.classes:
             print('** class doesn\'t exist **')
         else:
-            for obj in objs.values():
-                if obj.__class__.__name__ == args[0]:
-                    print(obj)
+            for obj in storage.all(args[0]).values():
+                print(obj)
 
     def do_update(self, arg):
         """Update an instance based on the class name and id"""
@@ -140,7 +145,7 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
         key = "{}.{}".format(args[0], args[1])
-        if key not in storage.all():
+        if storage.get(args[0], args[1]) is None:
             print("** no instance found **")
             return
         if len(args) == 2:
@@ -154,8 +159,12 @@ class HBNBCommand(cmd.Cmd):
             except json.JSONDecodeError:
                 print("** invalid dictionary **")
                 return
-            for attr_name, attr_value in attr_dict.items():
-                self.update_instance(key, attr_name, attr_value)
+            try:
+                with storage.batch():
+                    for attr_name, attr_value in attr_dict.items():
+                        self.update_instance(key, attr_name, attr_value)
+            except ValueError as error:
+                print(f"** {error} **")
         else:
             attr_parts = args[2].split()
             if len(attr_parts) < 2:
@@ -163,16 +172,30 @@ class HBNBCommand(cmd.Cmd):
                 return
             attr_name = attr_parts[0]
             attr_value = attr_parts[1]
-            self.update_instance(key, attr_name, attr_value)
+            try:
+                self.update_instance(key, attr_name, attr_value)
+            except ValueError as error:
+                print(f"** {error} **")
 
     def update_instance(self, key, attr_name, attr_value):
-        """Update instance helper to handle type conversion"""
-        obj = storage.all()[key]
-        if attr_value.isdigit():
-            attr_value = int(attr_value)
-        elif attr_value.replace('.', '', 1).isdigit():
-            attr_value = float(attr_value)
-        setattr(obj, attr_name, attr_value)
+        """
+        Update instance helper to handle type conversion.
+
+        Declared fields are converted by the schema of the class; the
+        type of other attributes is guessed from the value.
+
+        Raises:
+            ValueError: If the name or the value is rejected by the schema.
+        """
+        class_name, obj_id = key.split(".", 1)
+        obj = storage.get(class_name, obj_id)
+        fields = schema(type(obj))
+        if attr_name not in fields.fields and isinstance(attr_value, str):
+            if attr_value.isdigit():
+                attr_value = int(attr_value)
+            elif attr_value.replace('.', '', 1).isdigit():
+                attr_value = float(attr_value)
+        setattr(obj, attr_name, fields.coerce(attr_name, attr_value))
         obj.save()
 
     def do_count(self, line):
@@ -184,14 +207,11 @@ class HBNBCommand(cmd.Cmd):
         elif words[0] not in storage.classes():
             print("** class doesn't exist **")
         else:
-            matches = [
-                k for k in storage.all() if k.startswith(
-                    words[0] + '.')]
-            print(len(matches))
+            print(storage.count(words[0]))
 
     def default(self, arg):
         """Override default method to handle custom commands"""
-        parts = arg.split(".")
+        parts = arg.split(".", 1)
         if len(parts) == 2:
             class_name = parts[0]
             command = parts[1].strip("()")
@@ -206,7 +226,7 @@ class HBNBCommand(cmd.Cmd):
                 instance_id = command[8:-1].strip("\"")
                 self.do_destroy(f"{class_name} {instance_id}")
             elif command.startswith("update"):
-                args = command[7:-1].split(", ", 1)
+                args = command[7:].split(", ", 1)
                 if len(args) == 2:
                     instance_id = args[0].strip("\"")
                     if args[1].startswith("{") and args[1].endswith("}"):
@@ -1,5 +1,32 @@
 #!/usr/bin/env python3
 """Initializes the storage engine"""
-from models.engine.file_storage import FileStorage
-storage = FileStorage()
+import os
+from models import timestamps
+# before any model is built: instances keep the timestamps they are given
+timestamps.enable(os.getenv("HBNB_EPOCH_TIMESTAMPS") == "1")
+if os.getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage(os.getenv("HBNB_DB_PATH", "file.db"),
+                        cache_size=(int(os.environ["HBNB_DB_CACHE_SIZE"])
+                                    if "HBNB_DB_CACHE_SIZE" in os.environ
+                                    else None),
+                        compact_models=os.getenv("HBNB_COMPACT_MODELS") == "1")
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage(
+        file_path=os.getenv("HBNB_STORAGE_PATH"),
+        journal=os.getenv("HBNB_STORAGE_JOURNAL") == "1",
+        durability=os.getenv("HBNB_STORAGE_DURABILITY", "none"),
+        lazy=os.getenv("HBNB_STORAGE_LAZY") == "1",
+        shards=int(os.getenv("HBNB_STORAGE_SHARDS", "0")),
+        compression=os.getenv("HBNB_STORAGE_COMPRESSION"),
+        compress_level=(int(os.environ["HBNB_STORAGE_COMPRESS_LEVEL"])
+                        if "HBNB_STORAGE_COMPRESS_LEVEL" in os.environ
+                        else None),
+        group_commit=(float(os.environ["HBNB_STORAGE_GROUP_COMMIT_MS"]) / 1000
+                      if "HBNB_STORAGE_GROUP_COMMIT_MS" in os.environ
+                      else None),
+        thread_safe=os.getenv("HBNB_STORAGE_THREAD_SAFE") == "1",
+        shared=os.getenv("HBNB_STORAGE_SHARED") == "1",
+        compact_models=os.getenv("HBNB_COMPACT_MODELS") == "1")
 storage.reload()
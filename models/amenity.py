@@ -3,5 +3,5 @@
 from models.base_model import BaseModel
 class Amenity(BaseModel):
     """Amenity class module"""
-    name = ""
+    name: str = ""
 
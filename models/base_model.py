@@ -2,11 +2,24 @@
 """Module for the BaseModel class"""
 
 import uuid
-from datetime import datetime
-from models import storage
+from models import storage, timestamps
+from models.schema import schema
 
-class BaseModel:
-    """Defines all common attributes/methods for other classes."""
+class Model:
+    """
+    Defines the methods shared by BaseModel and the compact models.
+
+    Apart from the _serialized slot, which caches the to_dict() result
+    until an attribute is set (when _cache_dict is true), it holds no
+    attribute storage itself:
+    BaseModel instances keep their attributes in __dict__, the compact
+    ones (see models.compact) in slots. _state() and _set_state() read
+    and replace the attributes whatever the layout. With epoch timestamps
+    (see models.timestamps) the state holds created_at and updated_at raw.
+    """
+    __slots__ = ("_serialized",)
+    _cache_dict = True
+    id: str
 
     def __init__(self, *args, **kwargs):
         """
@@ -16,21 +29,56 @@ class BaseModel:
             id (str): A unique id for each instance.
             created_at (datetime): The current datetime when an instance is created.
             updated_at (datetime): The current datetime when an instance is created and updated every time the object changes.
+
+        Raises:
+            ValueError: If a keyword is not an identifier, or its value does not fit the declared type of the field (see models.schema).
         """
         if kwargs:
-            for key, value in kwargs.items():
-                if key != "__class__":
-                    setattr(self, key, value)
-            if "created_at" in kwargs:
-                self.created_at = datetime.fromisoformat(kwargs["created_at"])
-            if "updated_at" in kwargs:
-                self.updated_at = datetime.fromisoformat(kwargs["updated_at"])
+            state, stored = self._record_state(kwargs)
+            self._set_state(state)
+            if stored:
+                _serialized.__set__(self, kwargs)
         else:
             self.id = str(uuid.uuid4())
-            self.created_at = datetime.now()
-            self.updated_at = self.created_at
+            now = timestamps.now()
+            self.created_at = now
+            self.updated_at = now
             storage.new(self)
 
+    def __setattr__(self, name, value):
+        """
+        Sets an attribute and reports the change to the storage engine.
+
+        The cached to_dict() result is dropped. Inside storage.batch() the previous attributes are handed to the
+        storage first, so the batch can be rolled back.
+
+        Args:
+            name (str): The attribute name.
+            value: The new value.
+        """
+        if storage.batching:
+            storage.snapshot(self)
+        _serialized.__set__(self, None)
+        super().__setattr__(name, value)
+        storage.mark_dirty(self, name)
+
+    def __delattr__(self, name):
+        """
+        Deletes an attribute and reports the change to the storage engine.
+
+        The cached to_dict() result is dropped. Inside storage.batch()
+        the previous attributes are handed to the storage first, as for
+        __setattr__().
+
+        Args:
+            name (str): The attribute name.
+        """
+        if storage.batching:
+            storage.snapshot(self)
+        _serialized.__set__(self, None)
+        super().__delattr__(name)
+        storage.mark_dirty(self, name)
+
     def __str__(self):
         """
         Returns a string representation of the instance.
@@ -38,27 +86,181 @@ class BaseModel:
         Returns:
             str: String representation in the format [<class name>] (<self.id>) <self.__dict__>.
         """
-        return f"[{type(self).__name__}] ({self.id}) {self.__dict__}"
+        return f"[{type(self).__name__}] ({self.id}) {self._state()}"
 
     def save(self):
         """
         Updates the public instance attribute `updated_at` with the current datetime.
         """
-        self.updated_at = datetime.now()
+        self.updated_at = timestamps.now()
         storage.save()
 
     def to_dict(self):
         """
         Returns a dictionary containing all keys/values of the instance's `__dict__`.
         
+        The result is cached until an attribute is set, so an unchanged
+        object is only copied. An object built from a stored record
+        caches the record itself. Values changed in place (such as a list
+        attribute) are shared with the cache, as with `__dict__`.
+
         Returns:
             dict: A dictionary representation of the instance.
                   Includes a key `__class__` with the class name.
                   The `created_at` and `updated_at` attributes are converted to string objects in ISO format.
         """
-        dict_obj = self.__dict__.copy()
-        dict_obj["__class__"] = self.__class__.__name__
-        dict_obj["created_at"] = self.created_at.isoformat()
-        dict_obj["updated_at"] = self.updated_at.isoformat()
-        return dict_obj
+        try:
+            dict_obj = _serialized.__get__(self)
+        except AttributeError:
+            dict_obj = None
+        if dict_obj is None:
+            dict_obj = dict(self._state())
+            dict_obj["__class__"] = self.__class__.__name__
+            dict_obj["created_at"] = timestamps.isoformat(dict_obj["created_at"])
+            dict_obj["updated_at"] = timestamps.isoformat(dict_obj["updated_at"])
+            if not self._cache_dict:
+                return dict_obj
+            _serialized.__set__(self, dict_obj)
+        return dict(dict_obj)
+
+    @classmethod
+    def create_many(cls, rows):
+        """
+        Creates one instance per row and saves them all at once.
+
+        Args:
+            rows (iterable): The attributes of each new instance (see
+                storage.bulk_insert()).
+
+        Returns:
+            list: The new instances.
+        """
+        return storage.bulk_insert(cls, rows)
 
+    @classmethod
+    def _new_many(cls, rows):
+        """
+        Returns new instances built from rows, without any storage hook.
+
+        Each instance gets a new id unless its row has one, and they all
+        share the same created_at/updated_at unless their row sets them.
+        Row values go through the schema of the class.
+
+        Args:
+            rows (iterable): Dicts of attributes.
+
+        Raises:
+            ValueError: If a row is rejected by the schema.
+        """
+        coerce_record = schema(cls).coerce_record
+        now = timestamps.now()
+        objects = []
+        for row in rows:
+            state = {"id": str(uuid.uuid4()), "created_at": now,
+                     "updated_at": now}
+            state.update(coerce_record(row))
+            if not timestamps.enabled():
+                for name in timestamps.FIELDS:
+                    state[name] = timestamps.to_datetime(state[name])
+            obj = cls.__new__(cls)
+            obj._set_state(state)
+            objects.append(obj)
+        return objects
+
+    @classmethod
+    def _from_stored(cls, record):
+        """
+        Returns the instance of a record read back from storage.
+
+        The instance is filled directly, without the per-attribute hooks,
+        as it is not registered yet. A record its schema rejects (saved
+        before the fields were declared, or after a plain attribute
+        write) is loaded as it was stored instead of failing the whole
+        load.
+
+        Args:
+            record (dict): The stored attributes, with "__class__".
+
+        Raises:
+            ValueError: If the schema rejects a record that lacks its
+                created_at or updated_at.
+        """
+        state, stored = cls._record_state(record, strict=False)
+        obj = cls.__new__(cls)
+        obj._set_state(state)
+        if stored:
+            _serialized.__set__(obj, record)
+        return obj
+
+    @classmethod
+    def _record_state(cls, record, strict=True):
+        """
+        Returns the instance state of a kwargs record.
+
+        Values go through the schema of the class, and created_at and
+        updated_at become datetimes unless epoch timestamps are on.
+
+        Args:
+            record (dict): The attributes, "__class__" included or not.
+            strict (bool): False to keep the values of a record the
+                schema rejects as they are, if it has both timestamps.
+
+        Returns:
+            tuple: (state, stored), where stored tells whether record is
+                the to_dict() result of the state, to be cached.
+
+        Raises:
+            ValueError: If the schema rejects the record.
+        """
+        coerce = schema(cls).coerce
+        # a stored record is the serialized form of its object
+        stored = (cls._cache_dict and record.get("__class__") == cls.__name__
+                  and type(record.get("created_at")) is str
+                  and type(record.get("updated_at")) is str)
+        state = {}
+        try:
+            for key, value in record.items():
+                if key != "__class__":
+                    coerced = state[key] = coerce(key, value)
+                    if coerced is not value:
+                        stored = False
+        except ValueError:
+            if strict or not all(name in record
+                                 for name in timestamps.FIELDS):
+                raise
+            state = {key: value for key, value in record.items()
+                     if key != "__class__"}
+        # epoch timestamps keep the ISO strings until they are read
+        if not timestamps.enabled():
+            for name in timestamps.FIELDS:
+                if name in state:
+                    state[name] = timestamps.to_datetime(state[name])
+        return state, stored
+
+    def _state(self):
+        """
+        Returns the attributes set on the instance.
+
+        Returns:
+            dict: The instance __dict__ itself.
+        """
+        return self.__dict__
+
+    def _set_state(self, state):
+        """
+        Replaces the attributes of the instance without any storage hook.
+
+        Args:
+            state (dict): The new attributes.
+        """
+        _serialized.__set__(self, None)
+        self.__dict__.clear()
+        self.__dict__.update(state)
+
+
+_serialized = Model._serialized
+timestamps.register(Model)
+
+
+class BaseModel(Model):
+    """Defines all common attributes/methods for other classes."""
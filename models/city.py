@@ -12,6 +12,6 @@ class City(BaseModel):
         state_id (str): ID of the state the city belongs to.
         name (str): Name of the city.
     """
-    state_id = ""
-    name = ""
-
+    state_id: str = ""
+    name: str = ""
+    _indexes = {"state_id": "hash"}
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Module for the compact variants of the model classes.
+
+compact(User) returns a class named User whose instances keep the fields
+the model declares (its class attributes, plus id, created_at and
+updated_at) in __slots__ instead of a per-instance __dict__. Attributes
+that have no slot go to a small dict created on first use, so any key
+loaded from storage still round-trips. An unset field reads as the class
+default, as with the regular classes, and to_dict() leaves it out.
+
+Compact classes derive from models.base_model.Model, not from the
+regular class: isinstance(obj, User) is False for a compact User. The
+storage engines build them when opened with compact_models=True.
+"""
+
+from models import timestamps
+from models.base_model import Model
+
+_FIXED_FIELDS = ("id", "created_at", "updated_at")
+_compact_classes = {}
+
+
+class _Fallback:
+    """Stores the attributes that have no slot in the _extra dict"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        """Sets a slot, or an entry of _extra when name has no slot"""
+        try:
+            object.__setattr__(self, name, value)
+        except AttributeError:
+            extra = self._extra
+            if extra is None:
+                extra = {}
+                object.__setattr__(self, "_extra", extra)
+            extra[name] = value
+
+
+class CompactModel(Model, _Fallback):
+    """
+    Base class of the compact models built by compact().
+
+    Model.__setattr__ runs the storage hooks and hands the write to
+    _Fallback, which comes after it in the method resolution order.
+    to_dict() is not cached: the cached dict would take more memory than
+    the slots save.
+    """
+    __slots__ = ("_extra", "__weakref__")
+    _cache_dict = False
+    _defaults = {}
+    _members = ()
+
+    def __getattr__(self, name):
+        """Reads an attribute without slot from _extra, then the class defaults"""
+        if name == "_extra":
+            return None
+        extra = self._extra
+        if extra is not None and name in extra:
+            return extra[name]
+        defaults = type(self)._defaults
+        if name in defaults:
+            return defaults[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _state(self):
+        """
+        Returns the attributes set on the instance.
+
+        Returns:
+            dict: A new dict of the set slots and the _extra entries.
+        """
+        state = {}
+        for name, member in type(self)._members:
+            try:
+                state[name] = member.__get__(self)
+            except AttributeError:
+                pass
+        if self._extra:
+            state.update(self._extra)
+        return state
+
+    def _set_state(self, state):
+        """
+        Replaces the attributes of the instance without any storage hook.
+
+        Args:
+            state (dict): The new attributes.
+        """
+        for name, member in type(self)._members:
+            try:
+                member.__delete__(self)
+            except AttributeError:
+                pass
+        object.__setattr__(self, "_extra", None)
+        for name, value in state.items():
+            _Fallback.__setattr__(self, name, value)
+
+
+def compact(cls):
+    """
+    Returns the compact variant of a model class, built on first use.
+
+    Public class attributes that are not callable are the fields: they
+    get a slot and their value becomes the default. The other class
+    attributes (such as _indexes and _columns) are copied as they are.
+
+    Args:
+        cls (type): A model class, BaseModel or one of its subclasses.
+
+    Returns:
+        type: The compact class, with the same name as cls.
+    """
+    klass = _compact_classes.get(cls)
+    if klass is not None:
+        return klass
+    defaults, namespace = {}, {}
+    for base in reversed(cls.__mro__):
+        if base in (object, Model):
+            continue
+        for name, value in vars(base).items():
+            if name.startswith("__"):
+                continue
+            if name.startswith("_") or callable(value):
+                namespace[name] = value
+            else:
+                defaults[name] = value
+    fields = _FIXED_FIELDS + tuple(name for name in defaults
+                                   if name not in _FIXED_FIELDS)
+    namespace.update(__slots__=fields, __module__=cls.__module__,
+                     __qualname__=cls.__qualname__, __doc__=cls.__doc__,
+                     _defaults=defaults, model=cls)
+    klass = type(cls.__name__, (CompactModel,), namespace)
+    klass._members = tuple((name, vars(klass)[name]) for name in fields)
+    timestamps.register(klass, {name: vars(klass)[name]
+                                for name in timestamps.FIELDS})
+    _compact_classes[cls] = klass
+    return klass
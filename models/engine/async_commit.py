@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Module for the asyncio counterpart of the group-commit writer."""
+
+import asyncio
+
+
+class AsyncCommitter:
+    """
+    Runs a blocking write in the default executor for asyncio awaiters.
+
+    Writes run one at a time. Every awaiter arriving while a write is
+    running waits for the next one, and all of them share it, so a burst
+    of concurrent awaiters costs two writes at most. An awaiter that is
+    cancelled does not cancel the write it was waiting for.
+    """
+
+    def __init__(self, write):
+        """
+        Initializes the committer.
+
+        Args:
+            write (callable): Persists everything requested so far.
+        """
+        self.__write = write
+        self.__running = None
+        self.__queued = None
+        self.__requests = 0
+        self.__writes = 0
+
+    async def commit(self):
+        """
+        Waits until a write that started after this call has finished.
+
+        Raises:
+            Exception: The error of that write.
+        """
+        self.__requests += 1
+        if self.__queued is None:
+            self.__queued = asyncio.get_running_loop().create_task(
+                self.__run(self.__running))
+        await asyncio.shield(self.__queued)
+
+    def stats(self):
+        """
+        Returns the merge counters.
+
+        Returns:
+            dict: requests (awaited commits), writes (writes done) and
+                merged (commits served by another commit's write).
+        """
+        return {"requests": self.__requests, "writes": self.__writes,
+                "merged": self.__requests - self.__writes}
+
+    async def __run(self, previous):
+        """Waits for the running write, then writes for the queued awaiters"""
+        if previous is not None:
+            await asyncio.wait([previous])
+        task = asyncio.current_task()
+        self.__queued, self.__running = None, task
+        try:
+            await asyncio.get_running_loop().run_in_executor(None,
+                                                             self.__write)
+        finally:
+            self.__writes += 1
+            if self.__running is task:
+                self.__running = None
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Module for the compact binary snapshot format and its JSON converters.
+
+A binary snapshot groups the records of each class by shape (the tuple of
+their attribute names) into tables, so an attribute name and a class name
+are written once per table instead of once per record. Rows are plain
+tuples and created_at/updated_at are stored as integer microseconds since
+the epoch. The tables are serialized with pickle and read back by an
+unpickler that refuses to import anything, so a snapshot can only ever
+hold strings, numbers, lists and dicts. dump() writes any other datetime
+as its ISO string, as the JSON snapshots do, and rejects other types
+before they reach the file.
+
+Convert an existing store with:
+    python3 -m models.engine.binary_format to-binary file.json file.bin
+    python3 -m models.engine.binary_format to-json file.bin file.json
+"""
+
+import argparse
+import json
+import pickle
+from datetime import datetime, timedelta
+
+BINARY_SUFFIX = ".bin"
+MAGIC = b"HBNB"
+VERSION = 1
+DATETIME_FIELDS = ("created_at", "updated_at")
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler that only accepts the builtin container and scalar types"""
+
+    def find_class(self, module, name):
+        """Refuses every global, so loading cannot run arbitrary code"""
+        raise pickle.UnpicklingError(f"forbidden global: {module}.{name}")
+
+
+def _to_micros(value):
+    """Returns a naive datetime (or its ISO string) as epoch microseconds"""
+    if type(value) is str:
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if type(value) is datetime and value.tzinfo is None:
+        return (value - _EPOCH) // _MICROSECOND
+    return value
+
+
+def _from_micros(value):
+    """Returns the datetime of epoch microseconds, other values unchanged"""
+    if type(value) is int:
+        return _EPOCH + timedelta(microseconds=value)
+    return value
+
+
+def _plain(value):
+    """
+    Returns value made of builtin types only, which the unpickler accepts.
+
+    Datetimes become ISO strings, like _json_default() makes them.
+
+    Raises:
+        TypeError: If value holds any other type.
+    """
+    kind = type(value)
+    if kind in _SCALARS:
+        return value
+    if kind is list:
+        return [_plain(item) for item in value]
+    if kind is tuple:
+        return tuple(_plain(item) for item in value)
+    if kind is dict:
+        return {_plain(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{kind.__name__} cannot be stored in a binary snapshot")
+
+
+def dump(records, file):
+    """
+    Writes records to a binary file as a snapshot.
+
+    Args:
+        records (iterable): (class name, record) pairs. A record maps the
+            attribute names of an object to their values, including id;
+            a "__class__" entry is ignored. Datetimes may be datetime
+            objects or ISO strings.
+        file (file): A file opened in binary write mode.
+
+    Raises:
+        TypeError: If a value is not a string, number, None, datetime,
+            or a list, tuple or dict of those. Nothing is written then.
+    """
+    tables = {}
+    for name, record in records:
+        fields = tuple(attr for attr in record if attr != "__class__")
+        rows = tables.get((name, fields))
+        if rows is None:
+            rows = tables[(name, fields)] = []
+        row = []
+        for attr in fields:
+            value = record[attr]
+            if attr in DATETIME_FIELDS:
+                value = _to_micros(value)
+            if type(value) not in _SCALARS:
+                value = _plain(value)
+            row.append(value)
+        rows.append(tuple(row))
+    file.write(MAGIC)
+    pickle.dump((VERSION, [(name, fields, rows) for (name, fields), rows
+                           in tables.items()]),
+                file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load(file, raw_dates=False):
+    """
+    Yields the (key, record) pairs of a binary snapshot.
+
+    Records look like the ones of a JSON snapshot, except that created_at
+    and updated_at are already datetime objects.
+
+    Args:
+        file (file): A file opened in binary read mode.
+        raw_dates (bool): Leave created_at and updated_at as the epoch
+            microseconds they are stored as.
+
+    Raises:
+        ValueError: If the file is not a binary snapshot of a known version.
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a binary snapshot")
+    version, tables = _SnapshotUnpickler(file).load()
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version: {version}")
+    for name, fields, rows in tables:
+        dates = [position for position, attr in enumerate(fields)
+                 if attr in DATETIME_FIELDS and not raw_dates]
+        id_position = fields.index("id")
+        for row in rows:
+            if dates:
+                row = list(row)
+                for position in dates:
+                    row[position] = _from_micros(row[position])
+            record = dict(zip(fields, row))
+            record["__class__"] = name
+            yield f"{name}.{row[id_position]}", record
+
+
+def _json_default(value):
+    """Encodes the datetimes of a binary record for json.dump()"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def json_to_binary(source, target):
+    """
+    Converts a JSON snapshot to a binary one.
+
+    Args:
+        source (str): Path of the JSON snapshot.
+        target (str): Path of the binary snapshot to write.
+    """
+    from models.engine.file_storage import _iter_records
+
+    with open(source, 'r') as f:
+        records = [(key.partition('.')[0], record)
+                   for key, record in _iter_records(f)]
+    with open(target, 'wb') as f:
+        dump(records, f)
+
+
+def binary_to_json(source, target):
+    """
+    Converts a binary snapshot to a JSON one.
+
+    Args:
+        source (str): Path of the binary snapshot.
+        target (str): Path of the JSON snapshot to write.
+    """
+    with open(source, 'rb') as f:
+        records = dict(load(f))
+    with open(target, 'w') as f:
+        json.dump(records, f, default=_json_default)
+
+
+def main(argv=None):
+    """Parses the arguments and converts a snapshot"""
+    parser = argparse.ArgumentParser(
+        description="Converts a storage snapshot between JSON and binary.")
+    parser.add_argument("direction", choices=("to-binary", "to-json"))
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args(argv)
+    if args.direction == "to-binary":
+        json_to_binary(args.source, args.target)
+    else:
+        binary_to_json(args.source, args.target)
+
+
+if __name__ == "__main__":
+    main()
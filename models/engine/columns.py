@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Module for the columnar side files of numeric model attributes.
+
+A side file stores one typed array per attribute ("q" for 64-bit ints,
+"d" for doubles), one row per object, after a small header:
+
+    MAGIC | rows (uint64) | header length (uint32) | JSON header | columns
+
+The JSON header lists [name, typecode, offset] for every column, offsets
+being relative to the first column, which starts on an 8-byte boundary
+like every column after it. ColumnFile maps the file read-only, so an
+aggregate over a million rows reads the arrays in place and never builds
+a model instance.
+
+Values that are not numbers are stored as MISSING_INT in int columns and
+as NaN in double columns, and are skipped by the aggregates.
+"""
+
+import array
+import json
+import math
+import mmap
+import struct
+from models.engine.indexes import read_attribute
+
+MAGIC = b"HBNBCOL1"
+MISSING_INT = -(1 << 63)
+COLUMN_TYPES = ("q", "d")
+_HEADER = struct.Struct("<QI")
+_ALIGN = 8
+
+
+def _padding(size):
+    """Returns the number of bytes that align size on _ALIGN"""
+    return -size % _ALIGN
+
+
+def _cell(value, typecode):
+    """Returns value as stored in a column of typecode"""
+    if typecode == "d":
+        return float(value) if type(value) in (int, float) else math.nan
+    if type(value) is int and MISSING_INT < value < -MISSING_INT:
+        return value
+    return MISSING_INT
+
+
+def encode(objects, columns, defaults):
+    """
+    Returns the content of a side file as a list of byte strings.
+
+    Args:
+        objects (list): The instances or raw records, one per row.
+        columns (dict): {attribute: typecode}, typecodes from COLUMN_TYPES.
+        defaults (dict): {attribute: value} for objects missing one.
+
+    Raises:
+        ValueError: If a typecode is not in COLUMN_TYPES.
+    """
+    arrays, header, offset = [], [], 0
+    for attr, typecode in columns.items():
+        if typecode not in COLUMN_TYPES:
+            raise ValueError(f"unknown column type: {typecode}")
+        default = defaults.get(attr)
+        data = array.array(typecode, [
+            _cell(read_attribute(obj, attr, default), typecode)
+            for obj in objects])
+        arrays.append(data)
+        header.append([attr, typecode, offset])
+        offset += len(data) * data.itemsize
+    encoded = json.dumps({"columns": header}).encode()
+    chunks = [MAGIC, _HEADER.pack(len(objects), len(encoded)), encoded,
+              bytes(_padding(len(MAGIC) + _HEADER.size + len(encoded)))]
+    chunks.extend(data.tobytes() for data in arrays)
+    return chunks
+
+
+class ColumnFile:
+    """
+    Read-only, memory-mapped view of a side file.
+
+    The arrays returned by column() point into the mapping, so they must
+    be released before close(). Use the file as a context manager to
+    close it.
+
+    Attributes:
+        rows (int): The number of rows.
+        types (dict): {attribute: typecode} of the columns.
+    """
+
+    def __init__(self, path):
+        """
+        Maps a side file.
+
+        Args:
+            path (str): The side file.
+
+        Raises:
+            ValueError: If the file is not a side file.
+        """
+        with open(path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = len(MAGIC) + _HEADER.size
+        if self.__map[:len(MAGIC)] != MAGIC:
+            self.__map.close()
+            raise ValueError(f"not a column file: {path}")
+        self.rows, length = _HEADER.unpack_from(self.__map, len(MAGIC))
+        header = json.loads(self.__map[start:start + length])
+        data_start = start + length + _padding(start + length)
+        self.types = {}
+        self.__offsets = {}
+        for attr, typecode, offset in header["columns"]:
+            self.types[attr] = typecode
+            self.__offsets[attr] = data_start + offset
+
+    def __enter__(self):
+        """Returns the open file"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes the mapping"""
+        self.close()
+
+    def close(self):
+        """Unmaps the file"""
+        self.__map.close()
+
+    def column(self, attr):
+        """
+        Returns the raw array of a column, missing values included.
+
+        Args:
+            attr (str): The attribute.
+
+        Returns:
+            memoryview: A typed view over the mapped file.
+        """
+        typecode = self.types[attr]
+        start = self.__offsets[attr]
+        size = self.rows * struct.calcsize(typecode)
+        return memoryview(self.__map)[start:start + size].cast(typecode)
+
+    def values(self, attr):
+        """
+        Yields the numeric values of a column, skipping the missing ones.
+
+        Args:
+            attr (str): The attribute.
+        """
+        view = self.column(attr)
+        try:
+            if self.types[attr] == "d":
+                yield from (value for value in view if value == value)
+            else:
+                yield from (value for value in view if value != MISSING_INT)
+        finally:
+            view.release()
+
+    def stats(self, attr):
+        """
+        Aggregates the values of a column.
+
+        Args:
+            attr (str): The attribute.
+
+        Returns:
+            dict: count, sum, min, max and mean of the values (min, max and
+                mean are None for an empty column).
+        """
+        typecode = self.types[attr]
+        view = self.column(attr)
+        try:
+            if typecode == "d":
+                # a single NaN makes the whole sum NaN
+                complete = not math.isnan(sum(view))
+            else:
+                complete = MISSING_INT not in view
+            values = (view if complete
+                      else array.array(typecode, self.values(attr)))
+            if not len(values):
+                return {"count": 0, "sum": 0, "min": None, "max": None,
+                        "mean": None}
+            total = sum(values)
+            return {"count": len(values), "sum": total, "min": min(values),
+                    "max": max(values), "mean": total / len(values)}
+        finally:
+            view.release()
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""Module for the SQLite storage engine, a drop-in replacement for FileStorage."""
+
+import json
+import sqlite3
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from models.engine.file_storage import FileStorage, _name_of
+from models.engine.undo import UndoLog
+
+
+class DBStorage:
+    """
+    Stores instances as JSON rows in an SQLite database.
+
+    Every object is one row of the `objects` table keyed by (class, id), so
+    a point read is a primary-key lookup and a save only writes the rows of
+    the objects that changed since the last one. The attributes declared in
+    a model's `_indexes` get an expression index used by find(), range()
+    and ordered().
+
+    Changes are flushed to the open transaction before every query, so
+    reads always see them, and save() commits the transaction.
+
+    A batch() block defers the commit to its end and runs inside a
+    savepoint, so an exception rolls back both the rows and the
+    in-memory objects.
+
+    The instances built from rows are kept in an identity map, in least
+    recently used order. With cache_size set, the map holds at most that
+    many instances: the least recently used one is evicted when another
+    comes in, after its changes (if any) are written to the transaction.
+    An evicted instance the application still references is only held
+    weakly, and is reused instead of rebuilt while it is alive, so every
+    row keeps a single instance. cache_stats() reports the hit rate.
+
+    Attributes:
+        batching (bool): True inside a batch() block.
+        compact_models (bool): classes() returns the compact model
+            classes, whose instances keep their fields in slots.
+    """
+
+    classes = FileStorage.classes
+
+    def __init__(self, db_path="file.db", cache_size=None,
+                 compact_models=False):
+        """
+        Opens the database.
+
+        Args:
+            db_path (str): Path of the SQLite database file.
+            cache_size (int): The most instances kept in memory, None for
+                no limit.
+            compact_models (bool): Build the objects from the compact
+                model classes (see models.compact).
+
+        Raises:
+            ValueError: If cache_size is smaller than 1.
+        """
+        if cache_size is not None and cache_size < 1:
+            raise ValueError(f"invalid cache size: {cache_size}")
+        self.__connection = sqlite3.connect(db_path)
+        self.__cache_size = cache_size
+        self.__objects = OrderedDict()
+        self.__evicted = weakref.WeakValueDictionary()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__pending = {}
+        self.__unsaved = set()
+        self.batching = False
+        self.compact_models = compact_models
+        self.__undo = None
+
+    def reload(self):
+        """Creates the schema if needed and drops the cached clean instances"""
+        connection = self.__connection
+        connection.execute("CREATE TABLE IF NOT EXISTS objects ("
+                           "cls TEXT NOT NULL, id TEXT NOT NULL, "
+                           "data TEXT NOT NULL, PRIMARY KEY (cls, id)"
+                           ") WITHOUT ROWID")
+        for name, klass in self.classes().items():
+            for attr in getattr(klass, "_indexes", {}):
+                if isinstance(attr, str):
+                    connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{name}_{attr} "
+                        f"ON objects (cls, {self.__column(attr)})")
+        connection.commit()
+        self.__objects = OrderedDict(
+            (key, obj) for key, obj in self.__objects.items()
+            if key in self.__pending or key in self.__unsaved)
+        self.__evicted = weakref.WeakValueDictionary()
+
+    def refresh(self):
+        """
+        Drops the cached clean instances, so the rows other processes
+        committed are read again.
+
+        SQLite already locks the database between processes.
+
+        Returns:
+            bool: Always True, changes are not tracked.
+        """
+        self.__objects = OrderedDict(
+            (key, obj) for key, obj in self.__objects.items()
+            if key in self.__pending or key in self.__unsaved)
+        self.__evicted = weakref.WeakValueDictionary()
+        return True
+
+    def all(self, cls=None):
+        """
+        Returns the stored objects, or the objects of one class.
+
+        Args:
+            cls (type or str): Only return objects of this class (optional).
+
+        Returns:
+            dict: The objects, keyed by <class name>.id.
+        """
+        self.__flush()
+        if cls is None:
+            rows = self.__connection.execute(
+                "SELECT cls, id, data FROM objects")
+        else:
+            rows = self.__connection.execute(
+                "SELECT cls, id, data FROM objects WHERE cls = ?",
+                (_name_of(cls),))
+        classes = self.classes()
+        return {f"{name}.{obj_id}": self.__build(classes, name, obj_id, data)
+                for name, obj_id, data in rows}
+
+    def get(self, cls, id):
+        """
+        Retrieves one object by class and id with a primary-key lookup.
+
+        Args:
+            cls (type or str): The class or class name of the object.
+            id (str): The id of the object.
+
+        Returns:
+            BaseModel: The object, or None if it does not exist.
+        """
+        name = _name_of(cls)
+        key = f"{name}.{id}"
+        if key in self.__pending:
+            return self.__objects.get(key)
+        if key in self.__objects:
+            self.__hits += 1
+            self.__objects.move_to_end(key)
+            return self.__objects[key]
+        row = self.__connection.execute(
+            "SELECT data FROM objects WHERE cls = ? AND id = ?",
+            (name, id)).fetchone()
+        if row is None:
+            return None
+        return self.__build(self.classes(), name, id, row[0])
+
+    def count(self, cls=None):
+        """
+        Counts the stored objects without building any instance.
+
+        Args:
+            cls (type or str): Only count objects of this class (optional).
+
+        Returns:
+            int: The number of objects.
+        """
+        self.__flush()
+        if cls is None:
+            row = self.__connection.execute(
+                "SELECT COUNT(*) FROM objects").fetchone()
+        else:
+            row = self.__connection.execute(
+                "SELECT COUNT(*) FROM objects WHERE cls = ?",
+                (_name_of(cls),)).fetchone()
+        return row[0]
+
+    def find(self, cls, **equals):
+        """
+        Returns the objects of cls whose attributes equal the given values.
+
+        Args:
+            cls (type or str): The class or class name to search.
+            **equals: The attribute values to match.
+
+        Returns:
+            list: The matching objects.
+        """
+        name = _name_of(cls)
+        klass = self.classes()[name]
+        where, params = ["cls = ?"], [name]
+        for attr, value in equals.items():
+            column = self.__column(attr)
+            if value == getattr(klass, attr, None):
+                where.append(f"({column} = ? OR {column} IS NULL)")
+            else:
+                where.append(f"{column} = ?")
+            params.append(value)
+        return self.__select(" AND ".join(where), params)
+
+    def range(self, cls, attr, lo=None, hi=None):
+        """
+        Returns the objects of cls whose numeric attr is between lo and hi.
+
+        Args:
+            cls (type or str): The class or class name to search.
+            attr (str): The numeric attribute.
+            lo (int or float): The inclusive lower bound, None for no bound.
+            hi (int or float): The inclusive upper bound, None for no bound.
+
+        Returns:
+            list: The matching objects, by ascending attr.
+        """
+        return list(self.__ordered(cls, attr, lo, hi, False))
+
+    def ordered(self, cls, attr, reverse=False):
+        """
+        Yields the objects of cls sorted by a numeric attribute.
+
+        Args:
+            cls (type or str): The class or class name to iterate.
+            attr (str): The numeric attribute.
+            reverse (bool): Start from the largest value.
+        """
+        return self.__ordered(cls, attr, None, None, reverse)
+
+    def __ordered(self, cls, attr, lo, hi, reverse):
+        """Yields the objects of cls with lo <= attr <= hi, sorted by attr"""
+        name = _name_of(cls)
+        default = getattr(self.classes()[name], attr, None)
+        column = self.__column(attr)
+        if type(default) in (int, float) and ((lo is None or lo <= default)
+                                              and (hi is None or default <= hi)):
+            column = f"COALESCE({column}, {default!r})"
+        where = ["cls = ?", f"typeof({column}) IN ('integer', 'real')"]
+        params = [name]
+        if lo is not None:
+            where.append(f"{column} >= ?")
+            params.append(lo)
+        if hi is not None:
+            where.append(f"{column} <= ?")
+            params.append(hi)
+        order = f"{column} {'DESC' if reverse else 'ASC'}"
+        yield from self.__select(" AND ".join(where), params, order)
+
+    def __select(self, where, params, order=None):
+        """Returns the objects of the rows matching a WHERE clause"""
+        self.__flush()
+        sql = f"SELECT cls, id, data FROM objects WHERE {where}"
+        if order is not None:
+            sql += f" ORDER BY {order}"
+        classes = self.classes()
+        return [self.__build(classes, name, obj_id, data)
+                for name, obj_id, data in self.__connection.execute(sql, params)]
+
+    @staticmethod
+    def __column(attr):
+        """Returns the SQL expression reading attr from the JSON data"""
+        if not attr.isidentifier():
+            raise ValueError(f"invalid attribute name: {attr!r}")
+        return f"json_extract(data, '$.{attr}')"
+
+    def __build(self, classes, name, obj_id, data):
+        """Returns the cached instance of a row, building it if needed"""
+        key = f"{name}.{obj_id}"
+        obj = self.__cached(key)
+        if obj is None:
+            self.__misses += 1
+            obj = classes[name]._from_stored(json.loads(data))
+        else:
+            self.__hits += 1
+        self.__admit(key, obj)
+        return obj
+
+    def __cached(self, key):
+        """Returns the live instance of key, resident or evicted, or None"""
+        obj = self.__objects.get(key)
+        return self.__evicted.get(key) if obj is None else obj
+
+    def __admit(self, key, obj):
+        """Makes obj the most recently used instance, evicting past the cache size"""
+        self.__evicted.pop(key, None)
+        self.__objects[key] = obj
+        self.__objects.move_to_end(key)
+        if self.__cache_size is None:
+            return
+        while len(self.__objects) > self.__cache_size:
+            key, obj = next(iter(self.__objects.items()))
+            if key in self.__pending:
+                # write the change back before the instance can go away
+                self.__flush()
+            del self.__objects[key]
+            self.__evicted[key] = obj
+            self.__evictions += 1
+
+    def cache_stats(self):
+        """
+        Returns the counters of the instance cache.
+
+        Returns:
+            dict: hits (instances found in memory), misses (instances
+                built from a row), hit_rate, evictions, resident (the
+                instances held) and capacity (cache_size).
+        """
+        lookups = self.__hits + self.__misses
+        return {"hits": self.__hits, "misses": self.__misses,
+                "hit_rate": self.__hits / lookups if lookups else 0.0,
+                "evictions": self.__evictions,
+                "resident": len(self.__objects),
+                "capacity": self.__cache_size}
+
+    def new(self, obj):
+        """
+        Adds obj to the current session.
+
+        Args:
+            obj (BaseModel): The object to add.
+        """
+        key = f"{type(obj).__name__}.{obj.id}"
+        if self.batching:
+            self.__undo.remember(key, self.__cached(key))
+        self.__pending[key] = "new"
+        self.__admit(key, obj)
+
+    def bulk_insert(self, cls, rows):
+        """
+        Creates one object of cls per row and persists them with one save.
+
+        The objects are built without the per-object hooks of the kwargs
+        constructor, registered with new() in one pass and saved once,
+        as a batch: if any row is rejected, nothing is added.
+
+        Args:
+            cls (type or str): The class or class name of the objects.
+            rows (iterable): Dicts of attributes. id, created_at and
+                updated_at are filled in when a row does not set them.
+
+        Returns:
+            list: The new objects.
+
+        Raises:
+            ValueError: If a row does not fit the schema of the class.
+        """
+        objects = self.classes()[_name_of(cls)]._new_many(rows)
+        with self.batch():
+            for obj in objects:
+                self.new(obj)
+        return objects
+
+    def delete(self, obj=None):
+        """
+        Deletes obj from the current session.
+
+        Args:
+            obj (BaseModel): The object to remove.
+        """
+        if obj is None:
+            return
+        key = f"{type(obj).__name__}.{obj.id}"
+        if self.batching:
+            self.__undo.remember(key, self.__cached(key))
+        self.__objects.pop(key, None)
+        self.__evicted.pop(key, None)
+        self.__pending[key] = "destroy"
+
+    def mark_dirty(self, obj, attr=None):
+        """
+        Records that obj changed since the last save.
+
+        Args:
+            obj (BaseModel): The object that was updated.
+            attr (str): The attribute that changed, None if unknown.
+        """
+        obj_id = getattr(obj, "id", None)
+        if obj_id is None:
+            return
+        key = f"{type(obj).__name__}.{obj_id}"
+        if self.__cached(key) is obj:
+            self.__admit(key, obj)
+            self.__pending.setdefault(key, "update")
+
+    def snapshot(self, obj):
+        """
+        Remembers the attributes of obj before it changes inside a batch.
+
+        Args:
+            obj (BaseModel): The object about to be updated.
+        """
+        obj_id = getattr(obj, "id", None)
+        if obj_id is None or not self.batching:
+            return
+        key = f"{type(obj).__name__}.{obj_id}"
+        if self.__cached(key) is obj:
+            self.__undo.remember(key, obj)
+
+    @contextmanager
+    def batch(self):
+        """
+        Defers the commit until the end of the block, then saves once.
+
+        If the block raises, its rows are rolled back to a savepoint and
+        the objects it changed are restored. A batch opened inside
+        another one joins it.
+        """
+        if self.batching:
+            yield self
+            return
+        self.__flush()
+        unsaved = set(self.__unsaved)
+        connection = self.__connection
+        connection.execute("SAVEPOINT batch")
+        self.batching, self.__undo = True, UndoLog()
+        undo = self.__undo
+        try:
+            yield self
+        except BaseException:
+            connection.execute("ROLLBACK TO batch")
+            connection.execute("RELEASE batch")
+            self.__pending.clear()
+            for key, obj in undo.restore():
+                if obj is None:
+                    self.__objects.pop(key, None)
+                    self.__evicted.pop(key, None)
+                else:
+                    self.__admit(key, obj)
+            self.__unsaved = unsaved
+            raise
+        finally:
+            self.batching, self.__undo = False, None
+        connection.execute("RELEASE batch")
+        self.save()
+
+    def is_dirty(self, obj):
+        """
+        Tells whether obj changed since it was last saved.
+
+        Args:
+            obj (BaseModel): The object to check.
+
+        Returns:
+            bool: True if obj has unsaved changes.
+        """
+        key = f"{type(obj).__name__}.{obj.id}"
+        return key in self.__pending or key in self.__unsaved
+
+    def __flush(self):
+        """Writes the pending changes to the open transaction"""
+        if not self.__pending:
+            return
+        rows, removed = [], []
+        for key, op in self.__pending.items():
+            name, _, obj_id = key.partition('.')
+            obj = self.__objects.get(key)
+            if op == "destroy" or obj is None:
+                removed.append((name, obj_id))
+            else:
+                rows.append((name, obj_id, json.dumps(obj.to_dict())))
+        connection = self.__connection
+        connection.executemany(
+            "INSERT OR REPLACE INTO objects (cls, id, data) VALUES (?, ?, ?)",
+            rows)
+        connection.executemany("DELETE FROM objects WHERE cls = ? AND id = ?",
+                               removed)
+        self.__unsaved.update(self.__pending)
+        self.__pending.clear()
+
+    def save(self):
+        """Writes the changed rows and commits them, unless batching"""
+        if self.batching:
+            return
+        self.__flush()
+        if self.__unsaved:
+            self.__connection.commit()
+            self.__unsaved.clear()
@@ -1,42 +1,1350 @@
 #!/usr/bin/env python3
 """Module for the file storage model class to manage the JSON file storage and deserialization."""
 
+import asyncio
+import atexit
+import gzip
+import io
 import json
+import lzma
 import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from types import MappingProxyType
+from models import timestamps
+from models.engine import binary_format
+from models.engine.async_commit import AsyncCommitter
+from models.engine.columns import ColumnFile, encode as encode_columns
+from models.engine.group_commit import GroupCommitWriter
+from models.engine.indexes import INDEX_TYPES
+from models.engine.locks import ExclusiveLock, FileLock, ReadWriteLock
+from models.engine.undo import UndoLog
+
+DURABILITY_LEVELS = ("none", "file", "dir")
+COMPRESSIONS = {"none": None, "zlib": ".gz", "lzma": ".xz"}
+_COMPRESSION_MAGIC = {b"\x1f\x8b": "zlib", b"\xfd7zXZ\x00": "lzma"}
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _iter_records(file, chunk_size=1 << 16):
+    """
+    Yields the (key, record) pairs of a JSON object one at a time.
+
+    The file is read in chunks of chunk_size characters and only the record
+    being decoded is kept in memory, so loading never holds the whole parsed
+    snapshot next to the instances built from it.
+
+    Args:
+        file (file): A text file holding one JSON object.
+        chunk_size (int): The number of characters read at a time.
+
+    Raises:
+        json.JSONDecodeError: If the file is not a JSON object.
+    """
+    buffer, pos, eof = "", 0, False
+
+    def fill():
+        """Drops the consumed text and appends the next chunk"""
+        nonlocal buffer, pos, eof
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def peek():
+        """Skips whitespace and returns the next character ('' at the end)"""
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            fill()
+
+    def expect(token):
+        """Consumes token or raises if the next character is something else"""
+        nonlocal pos
+        if peek() != token:
+            raise json.JSONDecodeError(f"Expecting '{token}'", buffer, pos)
+        pos += 1
+
+    def decode():
+        """Decodes the next JSON value, reading more text until it is complete"""
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                value, pos = _DECODER.raw_decode(buffer, pos)
+                return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        key = decode()
+        expect(":")
+        yield key, decode()
+        if peek() == "}":
+            return
+        expect(",")
+
+
+def _fsync_dir(path):
+    """Flushes the directory entry of path to disk"""
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _remove(path):
+    """Removes path if it exists"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _compressed_writer(file, compression, level, binary):
+    """Wraps a binary file in a compressing stream (a text one unless binary)"""
+    if compression == "zlib":
+        stream = gzip.GzipFile(fileobj=file, mode='wb', mtime=0,
+                               compresslevel=6 if level is None else level)
+    else:
+        stream = lzma.LZMAFile(file, 'wb', preset=level)
+    return stream if binary else io.TextIOWrapper(stream, encoding="utf-8")
+
+
+def _snapshot_reader(file, binary):
+    """
+    Wraps a file opened in binary mode for reading a snapshot.
+
+    Compressed files are recognized by their magic bytes, whatever their
+    name, and decompressed as they are read.
+
+    Args:
+        file (file): The snapshot, opened with open(path, 'rb').
+        binary (bool): Return a binary stream instead of a text one.
+    """
+    head = file.peek(6)[:6]
+    stream = file
+    for magic, compression in _COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            if compression == "zlib":
+                stream = gzip.GzipFile(fileobj=file, mode='rb')
+            else:
+                stream = lzma.LZMAFile(file, 'rb')
+    return stream if binary else io.TextIOWrapper(stream, encoding="utf-8")
+
+
+def _atomic_write(path, chunks, durability, binary=False, compression="none",
+                  level=None):
+    """
+    Writes chunks to a temporary file and renames it over path.
+
+    Readers and crashes only ever see the old or the new content, never a
+    truncated file.
+
+    Args:
+        path (str): The file to replace.
+        chunks (iterable): The strings (or bytes if binary) to write.
+        durability (str): One of DURABILITY_LEVELS.
+        binary (bool): Open the file in binary mode.
+        compression (str): A key of COMPRESSIONS; the chunks are compressed
+            as they are written.
+        level (int): The zlib level or lzma preset, None for the default.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        compressed = compression != "none"
+        with open(tmp_path, 'wb' if binary or compressed else 'w') as file:
+            if compressed:
+                with _compressed_writer(file, compression, level,
+                                        binary) as stream:
+                    stream.writelines(chunks)
+            else:
+                file.writelines(chunks)
+            file.flush()
+            if durability != "none":
+                os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if durability == "dir":
+        _fsync_dir(path)
+
+
+def _stamp(path):
+    """Returns the (inode, size, mtime) of path, None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _timestamp(value):
+    """Returns an updated_at value, read from JSON or not, as an ISO string"""
+    if type(value) is int or hasattr(value, "isoformat"):
+        return timestamps.isoformat(value)
+    return value
+
+
+def _name_of(cls):
+    """Returns the class name of cls, which may already be a name"""
+    return cls if isinstance(cls, str) else cls.__name__
+
 
 class FileStorage:
     """
     Handles serialization and deserialization of instances to and from a JSON file.
+
+    In journal mode, save() appends one record per mutation to a log next to
+    the snapshot (<__file_path>.log) instead of rewriting the whole file.
+    reload() replays the log over the snapshot, and the log is folded back
+    into a fresh snapshot once it holds more than compact_after records.
+
+    Every object that changed since the last persist has its key in
+    __pending. Clean objects keep their encoded JSON fragment in
+    __fragments, so a save only re-encodes the dirty ones and a save with
+    nothing pending does no I/O at all.
+
+    Snapshots are written to a temporary file and renamed over __file_path.
+    The durability level picks how much is forced to disk before save()
+    returns: "none" (page cache only), "file" (fsync the data) or "dir"
+    (fsync the data and the directory entry of the rename).
+
+    In lazy mode reload() keeps the raw record dicts in __objects and an
+    instance is only built the first time it is handed out by all() or
+    get(). count() and key lookups work on the keys alone.
+
+    __by_class maps each class name to the keys of its objects (a dict used
+    as an ordered set), so all(cls) and count(cls) never scan the objects
+    of other classes.
+
+    Secondary indexes are declared on the models through an `_indexes`
+    class attribute ({attribute: kind}) or at runtime with add_index().
+    The indexes of a class are only filled by its first query, so a
+    reload() or a journal replay fills nothing but __by_class. From then
+    on they are kept up to date by new(), delete() and every attribute
+    write reported through mark_dirty(), until the next reload(). find()
+    uses them to answer equality queries without a scan. Range indexes keep numeric
+    attributes sorted for range() and ordered(), and a grid index over a
+    (latitude, longitude) pair answers within_radius(), within_box() and
+    nearest().
+
+    With shards set, the snapshot is a directory (<__file_path>.d) holding
+    one file per class, or shards files per class hash-partitioned by id.
+    save() only rewrites the shards holding pending changes (deletions
+    must go through delete()), and reload() only lists the shards: a class
+    is read the first time it is used. An existing single-file store is
+    migrated on the first reload.
+
+    A __file_path ending in ".bin" holds a binary snapshot (see
+    binary_format) instead of JSON. It only applies to the single-file
+    snapshot: the journal and the shards stay JSON.
+
+    The single-file snapshot is compressed while it is streamed to disk
+    when __file_path ends in ".gz" (zlib) or ".xz" (lzma), or when the
+    compression setting asks for it; "file.bin.gz" is a compressed binary
+    snapshot. Compressed snapshots are recognized by their content on
+    reload.
+
+    Models can declare numeric attributes in a `_columns` class attribute
+    ({attribute: typecode}). columns() writes their values to a columnar
+    side file (<__file_path>.<class name>.cols, see columns.py) and maps
+    it read-only, so aggregates never build an instance. The file is only
+    written by columns(): a save() that touches the class just marks it
+    stale, and the next columns() call rewrites it.
+
+    Inside a batch() block save() does nothing and the block saves once
+    when it exits. If it exits with an exception, the objects it added,
+    deleted or updated are put back as they were and nothing is written.
+
+    With group_commit set, save() only hands a request to a background
+    writer, which waits group_commit seconds for more requests and then
+    persists all of them in one write. flush() waits for the requests
+    made so far and close() (run at exit) writes the last ones and stops
+    the writer.
+
+    A lock keeps the writer and the mutating methods apart. With
+    thread_safe set it is a reader/writer lock (see locks.py): queries run
+    in parallel, mutations one at a time, and all() returns a copy.
+    save() encodes the pending records under the write lock and writes
+    them after releasing it, so queries keep running during the I/O.
+
+    refresh() loads what other processes saved since this one last read
+    or wrote the files, after checking their (inode, size, mtime) stamps:
+    a journal is read from the offset reached last time and only the
+    rewritten shards are read again. With shared set, the files are
+    guarded by an flock() on <__file_path>.lock (see locks.FileLock) and
+    every save merges the changes of the other processes first, so they
+    are not overwritten.
+
+    asave(), areload() and aall() are the asyncio counterparts of save(),
+    reload() and all(): the file I/O runs in the default executor, and
+    the asave() calls awaited at the same time share one write.
+
+    Attributes:
+        batching (bool): True while the calling thread is inside a batch()
+            block.
+        compact_models (bool): classes() returns the compact model
+            classes, whose instances keep their fields in slots.
     """
     __file_path = "file.json"
-    __objects = {}
 
-    def all(self):
+    def __init__(self, file_path=None, journal=False, compact_after=1000,
+                 durability="none", lazy=False, shards=0, compression=None,
+                 compress_level=None, group_commit=None, thread_safe=False,
+                 shared=False, compact_models=False):
+        """
+        Initializes the storage engine.
+
+        Args:
+            file_path (str): Path of the snapshot, defaults to __file_path.
+            journal (bool): Append mutations to a log instead of rewriting the snapshot.
+            compact_after (int): Number of log records that triggers a compaction.
+            durability (str): One of "none", "file" or "dir".
+            lazy (bool): Build instances on first access instead of on reload.
+            shards (int): 0 for a single file, 1 for a file per class, more
+                to also split each class in that many buckets by id.
+            compression (str): A key of COMPRESSIONS, None to pick it from
+                the extension of the file path.
+            compress_level (int): The zlib level (0-9) or lzma preset (0-9),
+                None for the default.
+            group_commit (float): Seconds a background writer waits to
+                merge save requests, None to save synchronously.
+            thread_safe (bool): Let threads read in parallel and keep them
+                apart from the writers.
+            shared (bool): Lock the files against other processes and merge
+                their changes before every save.
+            compact_models (bool): Build the loaded objects from the
+                compact model classes (see models.compact).
+
+        Raises:
+            ValueError: If durability or compression is not a known level.
         """
-        Returns the dictionary __objects.
-        
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"unknown durability level: {durability}")
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"unknown compression: {compression}")
+        if file_path is not None:
+            self.__file_path = file_path
+        self.__durability = durability
+        self.__journal = journal
+        self.__lazy = lazy
+        self.__has_raw = False
+        self.__shards = shards
+        self.__compression = compression
+        self.__compress_level = compress_level
+        self.__unloaded = {}
+        self.__stale = set()
+        self.__columns_stale = set()
+        self.compact_models = compact_models
+        self.__batch = threading.local()
+        self.__saves = 0
+        self.__thread_safe = thread_safe
+        self.__lock = ReadWriteLock() if thread_safe else ExclusiveLock()
+        self.__io_lock = threading.Lock()
+        self.__build_lock = threading.Lock()
+        self.__file_lock = (FileLock(f"{self.__file_path}.lock") if shared
+                            else None)
+        self.__state = {}
+        self.__log_offset = 0
+        self.__writer = None
+        self.__committer = AsyncCommitter(self.__persist)
+        if group_commit is not None:
+            self.__writer = GroupCommitWriter(self.__persist, group_commit)
+            atexit.register(self.close)
+        self.__compact_after = compact_after
+        self.__objects = {}
+        self.__pending = {}
+        self.__by_class = {}
+        self.__indexes = {}
+        self.__filled = set()
+        self.__fragments = {}
+        self.__persisted = 0
+        self.__log_records = 0
+
+    def all(self, cls=None):
+        """
+        Returns the objects of the storage, or the objects of one class.
+
+        Without cls a read-only view of __objects is returned, so that
+        objects are only added and removed through new() and delete(),
+        which keep the class index and the pending changes up to date.
+        In thread-safe mode it is a copy, so callers can iterate it while
+        other threads add or delete objects.
+
+        Args:
+            cls (type or str): Only return objects of this class (optional).
+
         Returns:
-            dict: The dictionary of all objects.
+            Mapping: The objects, keyed by <class name>.id.
+        """
+        if cls is not None:
+            name = _name_of(cls)
+            with self.__reading(name):
+                classes = self.classes()
+                return {key: self.__materialize(key, classes)
+                        for key in self.__keys_of(name)}
+        with self.__reading(None):
+            if self.__has_raw:
+                classes = self.classes()
+                for key, value in list(self.__objects.items()):
+                    if type(value) is dict:
+                        self.__materialize(key, classes)
+                self.__has_raw = False
+            if self.__thread_safe:
+                return dict(self.__objects)
+            return MappingProxyType(self.__objects)
+
+    def get(self, cls, id):
         """
-        return FileStorage.__objects
+        Retrieves one object by class and id.
+
+        Args:
+            cls (type or str): The class or class name of the object.
+            id (str): The id of the object.
+
+        Returns:
+            BaseModel: The object, or None if it does not exist.
+        """
+        name = _name_of(cls)
+        with self.__reading(name):
+            key = f"{name}.{id}"
+            if key not in self.__objects:
+                return None
+            return self.__materialize(key, self.classes())
+
+    def count(self, cls=None):
+        """
+        Counts the stored objects without building any instance.
+
+        Args:
+            cls (type or str): Only count objects of this class (optional).
+
+        Returns:
+            int: The number of objects.
+        """
+        name = None if cls is None else _name_of(cls)
+        with self.__reading(name):
+            if name is None:
+                return len(self.__objects)
+            return len(self.__keys_of(name))
+
+    @contextmanager
+    def __reading(self, name):
+        """
+        Holds a read section over the objects of a class (None for all).
+
+        The shards the section needs are loaded first, under the write
+        lock, so readers never change the dicts other readers iterate.
+        """
+        while True:
+            if self.__needs_load(name):
+                self.__load_shards(name)
+            with self.__lock.read():
+                # a reload() may have come in between the two sections
+                if not self.__needs_load(name):
+                    yield
+                    return
+
+    def __load_shards(self, name):
+        """Reads the shards of a class (all classes when name is None) under the write lock"""
+        with self.__lock.write():
+            self.__ensure_loaded(name)
+
+    def __needs_load(self, name):
+        """Tells whether shards of a class (any class when name is None) are not loaded yet"""
+        return bool(self.__unloaded) and (name is None
+                                          or name in self.__unloaded)
+
+    def __materialize(self, key, classes):
+        """Returns the instance stored at key, building it from a raw record if needed"""
+        value = self.__objects[key]
+        if type(value) is dict:
+            with self.__build_lock:
+                value = self.__objects[key]
+                if type(value) is dict:
+                    class_name, obj_id = key.split('.')
+                    value = classes[class_name]._from_stored(value)
+                    self.__objects[key] = value
+        return value
+
+    def find(self, cls, **equals):
+        """
+        Returns the objects of cls whose attributes equal the given values.
+
+        The smallest matching bucket of a secondary index is used as the
+        candidate set, falling back to the objects of the class.
+
+        Args:
+            cls (type or str): The class or class name to search.
+            **equals: The attribute values to match.
+
+        Returns:
+            list: The matching objects.
+        """
+        name = _name_of(cls)
+        self.__fill_indexes(name)
+        with self.__reading(name):
+            candidates = self.__keys_of(name)
+            for index in self.__class_indexes(name):
+                attr = index.attrs[0]
+                if len(index.attrs) == 1 and attr in equals:
+                    keys = index.lookup(equals[attr])
+                    if len(keys) < len(candidates):
+                        candidates = keys
+            classes = self.classes()
+            found = []
+            for key in list(candidates):
+                obj = self.__materialize(key, classes)
+                if all(getattr(obj, attr, None) == value
+                       for attr, value in equals.items()):
+                    found.append(obj)
+            return found
+
+    def range(self, cls, attr, lo=None, hi=None):
+        """
+        Returns the objects of cls whose numeric attr is between lo and hi.
+
+        A range index on attr is declared on first use if the model does
+        not declare one.
+
+        Args:
+            cls (type or str): The class or class name to search.
+            attr (str): The numeric attribute.
+            lo (int or float): The inclusive lower bound, None for no bound.
+            hi (int or float): The inclusive upper bound, None for no bound.
+
+        Returns:
+            list: The matching objects, by ascending attr.
+        """
+        name = _name_of(cls)
+        index = self.__index_for(name, attr, "range")
+        with self.__reading(name):
+            classes = self.classes()
+            return [self.__materialize(key, classes)
+                    for key in index.range(lo, hi)]
+
+    def ordered(self, cls, attr, reverse=False):
+        """
+        Yields the objects of cls sorted by a numeric attribute.
+
+        Objects whose attr is not a number are skipped. Taking the first N
+        items gives the N smallest (or largest) without sorting the class.
+        The attribute must not be updated while the iteration is running.
+
+        Args:
+            cls (type or str): The class or class name to iterate.
+            attr (str): The numeric attribute.
+            reverse (bool): Start from the largest value.
+        """
+        name = _name_of(cls)
+        index = self.__index_for(name, attr, "range")
+        classes = self.classes()
+        if self.__thread_safe:
+            # a generator cannot hold the read lock between two items
+            with self.__reading(name):
+                keys = list(index.ordered(reverse))
+        else:
+            keys = index.ordered(reverse)
+        for key in keys:
+            with self.__lock.read():
+                obj = (self.__materialize(key, classes)
+                       if key in self.__objects else None)
+            if obj is not None:
+                yield obj
+
+    def within_radius(self, cls, latitude, longitude, km):
+        """
+        Returns the objects of cls within km kilometers of a point.
+
+        Args:
+            cls (type or str): The class or class name to search.
+            latitude (float): The latitude of the center.
+            longitude (float): The longitude of the center.
+            km (float): The radius in kilometers.
+
+        Returns:
+            list: (distance, object) pairs, nearest first.
+        """
+        name = _name_of(cls)
+        index = self.__index_for(name, ("latitude", "longitude"), "grid")
+        with self.__reading(name):
+            classes = self.classes()
+            return [(distance, self.__materialize(key, classes))
+                    for distance, key
+                    in index.within_radius(latitude, longitude, km)]
+
+    def within_box(self, cls, south, west, north, east):
+        """
+        Returns the objects of cls inside a latitude/longitude bounding box.
+
+        Args:
+            cls (type or str): The class or class name to search.
+            south (float): The minimum latitude.
+            west (float): The western longitude.
+            north (float): The maximum latitude.
+            east (float): The eastern longitude (smaller than west when the
+                box crosses the 180th meridian).
+
+        Returns:
+            list: The matching objects.
+        """
+        name = _name_of(cls)
+        index = self.__index_for(name, ("latitude", "longitude"), "grid")
+        with self.__reading(name):
+            classes = self.classes()
+            return [self.__materialize(key, classes)
+                    for key in index.within_box(south, west, north, east)]
+
+    def nearest(self, cls, latitude, longitude, k=1):
+        """
+        Returns the k objects of cls closest to a point.
+
+        Args:
+            cls (type or str): The class or class name to search.
+            latitude (float): The latitude of the point.
+            longitude (float): The longitude of the point.
+            k (int): The number of neighbours.
+
+        Returns:
+            list: (distance, object) pairs, nearest first.
+        """
+        name = _name_of(cls)
+        index = self.__index_for(name, ("latitude", "longitude"), "grid")
+        with self.__reading(name):
+            classes = self.classes()
+            return [(distance, self.__materialize(key, classes))
+                    for distance, key
+                    in index.nearest(latitude, longitude, k)]
+
+    def add_index(self, cls, attr, kind="hash"):
+        """
+        Declares a secondary index on attr and fills it from stored objects.
+
+        Args:
+            cls (type or str): The class or class name to index.
+            attr (str or tuple): The attribute to index, or the
+                (latitude, longitude) pair of a grid index.
+            kind (str): The index type, a key of INDEX_TYPES.
+
+        Returns:
+            The new index.
+        """
+        name = _name_of(cls)
+        self.__fill_indexes(name)
+        with self.__lock.write():
+            self.__ensure_loaded(name)
+            return self.__add_index(name, attr, kind)
+
+    def __index_for(self, name, attr, kind):
+        """Returns the index a query needs, declaring it if it does not exist"""
+        attrs = attr if isinstance(attr, tuple) else (attr,)
+        self.__fill_indexes(name)
+        with self.__reading(name):
+            for index in self.__class_indexes(name):
+                if index.attrs == attrs and type(index) is INDEX_TYPES[kind]:
+                    return index
+        return self.add_index(name, attr, kind)
+
+    def __add_index(self, name, attr, kind):
+        """Returns the index of attr, creating and filling it if needed"""
+        attrs = attr if isinstance(attr, tuple) else (attr,)
+        indexes = self.__indexes.setdefault(name, [])
+        for index in indexes:
+            if index.attrs == attrs and type(index) is INDEX_TYPES[kind]:
+                return index
+        klass = self.classes()[name]
+        defaults = tuple(getattr(klass, item, None) for item in attrs)
+        index = INDEX_TYPES[kind](attr, defaults if len(attrs) > 1
+                                  else defaults[0])
+        if name in self.__filled:
+            self.__fill(name, index)
+        indexes.append(index)
+        return index
+
+    def __fill_indexes(self, name):
+        """Declares the model indexes of a class and fills its indexes, on its first query"""
+        if name in self.__filled:
+            return
+        with self.__lock.write():
+            if name in self.__filled:
+                return
+            self.__ensure_loaded(name)
+            klass = self.classes().get(name)
+            for attr, kind in getattr(klass, "_indexes", {}).items():
+                self.__add_index(name, attr, kind)
+            for index in self.__indexes.get(name, ()):
+                self.__fill(name, index)
+            self.__filled.add(name)
+
+    def __fill(self, name, index):
+        """Fills an index from the objects of its class"""
+        objects = self.__objects
+        index.fill((key, index.value_of(objects[key]))
+                   for key in self.__by_class.get(name, ()))
+
+    def __class_indexes(self, name):
+        """Returns the secondary indexes of a class, none until they are filled"""
+        if name not in self.__filled:
+            return ()
+        return self.__indexes.get(name, ())
+
+    def __keys_of(self, name):
+        """Returns the keys of a class (a dict used as an ordered set), loading its shards first"""
+        self.__ensure_loaded(name)
+        return self.__by_class.get(name, {})
+
+    def __index(self, key):
+        """Adds key to the key index and the secondary indexes of its class"""
+        name = key.partition('.')[0]
+        self.__by_class.setdefault(name, {})[key] = None
+        for index in self.__class_indexes(name):
+            index.update(key, index.value_of(self.__objects[key]))
+
+    def __unindex(self, key):
+        """Removes key from the key index and the secondary indexes of its class"""
+        name = key.partition('.')[0]
+        self.__by_class.get(name, {}).pop(key, None)
+        for index in self.__class_indexes(name):
+            index.remove(key)
 
     def new(self, obj):
         """
         Sets obj in __objects with key <obj class name>.id.
-        
+
         Args:
             obj (BaseModel): The object to set in __objects.
         """
-        key = f"{type(obj).__name__}.{obj.id}"
-        FileStorage.__objects[key] = obj
+        with self.__lock.write():
+            self.__ensure_loaded(type(obj).__name__)
+            key = f"{type(obj).__name__}.{obj.id}"
+            undo = self.__batch_undo()
+            if undo is not None:
+                undo.remember(key, self.__objects.get(key))
+            self.__objects[key] = obj
+            self.__index(key)
+            self.__pending[key] = "new"
+            self.__fragments.pop(key, None)
+
+    def bulk_insert(self, cls, rows):
+        """
+        Creates one object of cls per row and persists them with one save.
+
+        The objects are built without the per-object hooks of the kwargs
+        constructor, registered with new() in one pass and saved once,
+        as a batch: if any row is rejected, nothing is added.
+
+        Args:
+            cls (type or str): The class or class name of the objects.
+            rows (iterable): Dicts of attributes. id, created_at and
+                updated_at are filled in when a row does not set them.
+
+        Returns:
+            list: The new objects.
+
+        Raises:
+            ValueError: If a row does not fit the schema of the class.
+        """
+        objects = self.classes()[_name_of(cls)]._new_many(rows)
+        with self.batch():
+            for obj in objects:
+                self.new(obj)
+        return objects
+
+    def delete(self, obj=None):
+        """
+        Deletes obj from __objects if it's inside.
+
+        Args:
+            obj (BaseModel): The object to remove.
+        """
+        if obj is None:
+            return
+        with self.__lock.write():
+            key = f"{type(obj).__name__}.{obj.id}"
+            undo = self.__batch_undo()
+            if undo is not None:
+                undo.remember(key, self.__objects.get(key))
+            if self.__objects.pop(key, None) is not None:
+                self.__unindex(key)
+                self.__pending[key] = "destroy"
+                self.__fragments.pop(key, None)
+
+    def mark_dirty(self, obj, attr=None):
+        """
+        Records that obj changed since the last save.
+
+        Called by BaseModel whenever an attribute is set. Objects that are
+        not (yet) registered in __objects are ignored.
+
+        Args:
+            obj (BaseModel): The object that was updated.
+            attr (str): The attribute that changed, None if unknown.
+        """
+        obj_id = getattr(obj, "id", None)
+        if obj_id is None:
+            return
+        key = f"{type(obj).__name__}.{obj_id}"
+        # instances being built from a record are skipped without locking
+        if self.__objects.get(key) is not obj:
+            return
+        with self.__lock.write():
+            if self.__objects.get(key) is obj:
+                self.__pending.setdefault(key, "update")
+                self.__fragments.pop(key, None)
+                for index in self.__class_indexes(type(obj).__name__):
+                    if attr is None or attr in index.attrs:
+                        index.update(key, index.value_of(obj))
+
+    def snapshot(self, obj):
+        """
+        Remembers the attributes of obj before it changes inside a batch.
+
+        Called by BaseModel before an attribute is set while batching.
+
+        Args:
+            obj (BaseModel): The object about to be updated.
+        """
+        obj_id = getattr(obj, "id", None)
+        undo = self.__batch_undo()
+        if obj_id is None or undo is None:
+            return
+        key = f"{type(obj).__name__}.{obj_id}"
+        if self.__objects.get(key) is obj:
+            with self.__lock.write():
+                undo.remember(key, obj)
+
+    @property
+    def batching(self):
+        """True while the calling thread is inside a batch() block"""
+        return self.__batch_undo() is not None
+
+    def __batch_undo(self):
+        """Returns the undo log of the batch of the calling thread, None outside one"""
+        return getattr(self.__batch, "undo", None)
+
+    @contextmanager
+    def batch(self):
+        """
+        Defers persistence until the end of the block, then saves once.
+
+        If the block raises, the objects it added, deleted or updated
+        through the storage API or attribute writes are restored and
+        nothing is saved. A batch opened inside another one joins it.
+
+        The batch belongs to the calling thread: the saves of other
+        threads go on during the block, and a rollback only restores
+        what this thread changed.
+        """
+        if self.batching:
+            yield self
+            return
+        with self.__lock.read():
+            pending, saves = dict(self.__pending), self.__saves
+        undo = self.__batch.undo = UndoLog()
+        try:
+            yield self
+        except BaseException:
+            self.__rollback(undo, pending, saves)
+            raise
+        finally:
+            self.__batch.undo = None
+        self.save()
+
+    def __rollback(self, undo, pending, saves):
+        """
+        Restores the objects remembered by undo and their pending state.
+
+        pending and saves are the pending set and the persist count at
+        the start of the batch. Once another thread saved during the
+        batch, the files may hold its changes, so the restored objects
+        stay pending to be written back.
+        """
+        with self.__lock.write():
+            saved = self.__saves != saves
+            for key, obj in undo.restore():
+                self.__unindex(key)
+                self.__fragments.pop(key, None)
+                if obj is None:
+                    self.__objects.pop(key, None)
+                else:
+                    self.__objects[key] = obj
+                    self.__index(key)
+                if key in pending:
+                    self.__pending[key] = pending[key]
+                elif saved:
+                    self.__pending[key] = "destroy" if obj is None else "update"
+                else:
+                    self.__pending.pop(key, None)
+
+    def is_dirty(self, obj):
+        """
+        Tells whether obj changed since it was last persisted.
+
+        Args:
+            obj (BaseModel): The object to check.
+
+        Returns:
+            bool: True if obj has unsaved changes.
+        """
+        with self.__lock.read():
+            return f"{type(obj).__name__}.{obj.id}" in self.__pending
 
     def save(self):
         """
         Serializes __objects to the JSON file (path: __file_path).
+
+        In journal mode only the pending mutations are appended to the log.
+        Inside a batch() block nothing is written until the block exits,
+        and with group commit the write is left to the background writer.
+        """
+        if self.batching:
+            return
+        if self.__writer is not None:
+            self.__writer.request()
+            return
+        self.__persist()
+
+    def flush(self):
+        """
+        Waits until the background writer has persisted every save so far.
+
+        Raises:
+            Exception: The error of a background write that failed since
+                the last flush().
+        """
+        if self.__writer is not None:
+            self.__writer.flush()
+
+    def close(self):
+        """Persists the outstanding saves and stops the background writer"""
+        if self.__writer is not None:
+            writer, self.__writer = self.__writer, None
+            writer.close()
+
+    def commit_stats(self):
+        """
+        Returns the counters of the background writer.
+
+        Returns:
+            dict: See GroupCommitWriter.stats(), None without group commit.
+        """
+        return None if self.__writer is None else self.__writer.stats()
+
+    async def asave(self):
+        """
+        Awaitable save(): the write runs in the default executor.
+
+        The awaiters that arrive while a write is running all wait for
+        the next one, which persists their changes in a single write.
+        Inside a batch() block it does nothing, like save().
+
+        Raises:
+            Exception: The error of the write.
+        """
+        if self.batching:
+            return
+        await self.__committer.commit()
+
+    def async_stats(self):
+        """
+        Returns the counters of asave().
+
+        Returns:
+            dict: See AsyncCommitter.stats().
+        """
+        return self.__committer.stats()
+
+    async def areload(self):
+        """Awaitable reload(), run in the default executor"""
+        await asyncio.get_running_loop().run_in_executor(None, self.reload)
+
+    async def aall(self, cls=None, chunk=1000):
+        """
+        Iterates over the objects, or the objects of one class, with async for.
+
+        Shards not loaded yet are read in the default executor, and the
+        event loop gets control back after every chunk objects, so a long
+        scan does not stall the other tasks. Objects deleted during the
+        iteration are skipped.
+
+        Args:
+            cls (type or str): Only iterate objects of this class (optional).
+            chunk (int): The number of objects yielded between two returns
+                to the event loop.
+        """
+        name = None if cls is None else _name_of(cls)
+        if self.__needs_load(name):
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.__load_shards, name)
+        with self.__reading(name):
+            keys = list(self.__objects if name is None
+                        else self.__keys_of(name))
+        classes = self.classes()
+        for start in range(0, len(keys), chunk):
+            with self.__lock.read():
+                objs = [self.__materialize(key, classes)
+                        for key in keys[start:start + chunk]
+                        if key in self.__objects]
+            for obj in objs:
+                yield obj
+            await asyncio.sleep(0)
+
+    def __persist(self):
+        """
+        Writes the pending changes, the work of one save().
+
+        The records are encoded under the write lock, from a consistent
+        view of __objects, and written once it is released so readers
+        are not blocked by the disk. A second lock keeps the writes of
+        two persists in order.
+
+        A shared storage holds the file lock for the whole persist and
+        first loads what other processes saved, so their changes are
+        written back instead of being overwritten.
+        """
+        with self.__io_lock, self.__locked_files(exclusive=True):
+            with self.__lock.write():
+                if self.__file_lock is not None:
+                    self.__refresh()
+                pending = dict(self.__pending)
+                self.__saves += 1
+                ops = self.__save_pending()
+            self.__run(ops, pending)
+
+    def __locked_files(self, exclusive):
+        """Returns the file lock section of an access to the store files"""
+        if self.__file_lock is None:
+            return nullcontext()
+        if exclusive:
+            return self.__file_lock.exclusive()
+        return self.__file_lock.shared()
+
+    def __run(self, ops, pending):
+        """Runs the writes of a persist, putting pending back if one fails"""
+        if not ops:
+            return
+        try:
+            for op in ops:
+                op()
+        except BaseException:
+            with self.__lock.write():
+                for key, op in pending.items():
+                    self.__pending.setdefault(key, op)
+                self.__persisted = -1
+            raise
+        with self.__lock.write():
+            self.__state = self.__disk_state()
+            log = self.__state.get(self.__log_path())
+            self.__log_offset = 0 if log is None else log[1]
+
+    def __save_pending(self):
+        """Returns the writes of the pending changes in the configured layout"""
+        self.__columns_stale.update(key.partition('.')[0]
+                                    for key in self.__pending)
+        if self.__journal:
+            ops = self.__append_journal()
+        elif self.__shards:
+            ops = []
+            if self.__pending:
+                ops = self.__write_shards(self.__pending)
+                self.__persisted = len(self.__objects)
+                self.__pending.clear()
+        elif self.__pending or len(self.__objects) != self.__persisted:
+            ops = self.__compact()
+        else:
+            ops = []
+        return ops
+
+    def compact(self):
+        """
+        Writes a full snapshot of __objects and discards the journal.
+
+        Only objects without a cached fragment are passed through to_dict().
+        """
+        with self.__io_lock, self.__locked_files(exclusive=True):
+            with self.__lock.write():
+                if self.__file_lock is not None:
+                    self.__refresh()
+                pending = dict(self.__pending)
+                self.__saves += 1
+                ops = self.__compact()
+            self.__run(ops, pending)
+
+    def __compact(self):
+        """Returns the writes of a full snapshot, clearing the pending set"""
+        self.__ensure_loaded()
+        if self.__shards:
+            ops = self.__write_shards(None)
+        else:
+            if len(self.__fragments) > len(self.__objects):
+                self.__fragments = {key: fragment for key, fragment
+                                    in self.__fragments.items()
+                                    if key in self.__objects}
+            ops = [self.__write_snapshot()]
+        self.__persisted = len(self.__objects)
+        self.__pending.clear()
+        self.__log_records = 0
+        ops.append(partial(_remove, self.__log_path()))
+        self.__columns_stale.update(self.__by_class)
+        return ops
+
+    def columns(self, cls):
+        """
+        Maps the columnar side file of a class declaring `_columns`.
+
+        The file is written first if it does not exist yet, or if a
+        save() changed the class since it was written.
+
+        Args:
+            cls (type or str): The class or class name.
+
+        Returns:
+            ColumnFile: The open file, to be closed by the caller.
+
+        Raises:
+            ValueError: If the class declares no columns.
         """
-        obj_dict = {key: obj.to_dict() for key, obj in FileStorage.__objects.items()}
-        with open(FileStorage.__file_path, 'w') as file:
-            json.dump(obj_dict, file)
+        name = _name_of(cls)
+        if not getattr(self.classes()[name], "_columns", None):
+            raise ValueError(f"{name} declares no columns")
+        with self.__io_lock, self.__locked_files(exclusive=True):
+            with self.__lock.write():
+                ops = []
+                if (name in self.__columns_stale
+                        or not os.path.exists(self.__columns_path(name))):
+                    self.__columns_stale.discard(name)
+                    ops.append(self.__write_columns(name))
+            self.__run(ops, {})
+        return ColumnFile(self.__columns_path(name))
+
+    def __columns_path(self, name):
+        """Returns the columnar side file of a class"""
+        return f"{self.__file_path}.{name}.cols"
+
+    def __write_columns(self, name):
+        """Encodes the columns of a class and returns the write of its side file"""
+        klass = self.classes()[name]
+        columns = klass._columns
+        objects = [self.__objects[key] for key in self.__keys_of(name)]
+        defaults = {attr: getattr(klass, attr, None) for attr in columns}
+        return partial(_atomic_write, self.__columns_path(name),
+                       encode_columns(objects, columns, defaults),
+                       self.__durability, binary=True)
+
+    def __columns_outdated(self, name):
+        """Tells whether the side file of a class is older than its data"""
+        try:
+            written = os.path.getmtime(self.__columns_path(name))
+        except FileNotFoundError:
+            return name in self.__by_class or name in self.__unloaded
+        sources = [self.__file_path, self.__log_path()]
+        sources.extend(self.__unloaded.get(name, ()))
+        return any(os.path.exists(path) and os.path.getmtime(path) > written
+                   for path in sources)
+
+    def __snapshot_format(self):
+        """Returns (binary, compression) of the single-file snapshot"""
+        path, compression = self.__file_path, self.__compression
+        for name, suffix in COMPRESSIONS.items():
+            if suffix is not None and path.endswith(suffix):
+                path = path[:-len(suffix)]
+                if compression is None:
+                    compression = name
+        return (path.endswith(binary_format.BINARY_SUFFIX),
+                compression or "none")
+
+    def __write_snapshot(self):
+        """Encodes every object and returns the write of the single-file snapshot"""
+        binary, compression = self.__snapshot_format()
+        if binary:
+            buffer = io.BytesIO()
+            binary_format.dump(((key.partition('.')[0],
+                                 obj if type(obj) is dict else obj._state())
+                                for key, obj in self.__objects.items()),
+                               buffer)
+            chunks = (buffer.getvalue(),)
+        else:
+            fragments = [self.__fragment(key) for key in self.__objects]
+            chunks = ("{", ", ".join(fragments), "}")
+        return partial(_atomic_write, self.__file_path, chunks,
+                       self.__durability, binary=binary,
+                       compression=compression, level=self.__compress_level)
+
+    def __read_snapshot(self, classes):
+        """Loads the single-file snapshot, if it exists"""
+        binary = self.__snapshot_format()[0]
+        for key, value in self.__snapshot_records(binary):
+            self.__load(classes, key, value, decoded=binary)
+
+    def __snapshot_records(self, binary):
+        """Yields the (key, record) pairs of the single-file snapshot, if it exists"""
+        try:
+            with open(self.__file_path, 'rb') as raw:
+                with _snapshot_reader(raw, binary) as f:
+                    # raw records of a lazy store must stay JSON-ready
+                    yield from (binary_format.load(
+                                    f, raw_dates=(timestamps.enabled()
+                                                  and not self.__lazy))
+                                if binary else _iter_records(f))
+        except FileNotFoundError:
+            pass
+
+    def __fragment(self, key):
+        """Returns the encoded "key": record pair of key, encoding it if it changed"""
+        fragment = self.__fragments.get(key)
+        if fragment is None:
+            obj = self.__objects[key]
+            record = obj if type(obj) is dict else obj.to_dict()
+            fragment = (f"{json.dumps(key)}: "
+                        f"{json.dumps(record, default=binary_format._json_default)}")
+            self.__fragments[key] = fragment
+        return fragment
+
+    def __shard_dir(self):
+        """Returns the directory holding the shards"""
+        return f"{self.__file_path}.d"
+
+    def __shard_of(self, key):
+        """Returns the (class name, bucket) shard of a key"""
+        name, _, obj_id = key.partition('.')
+        if self.__shards == 1:
+            return name, None
+        return name, zlib.crc32(obj_id.encode()) % self.__shards
+
+    def __shard_path(self, shard):
+        """Returns the file of a (class name, bucket) shard"""
+        name, bucket = shard
+        filename = f"{name}.json" if bucket is None else f"{name}.{bucket}.json"
+        return os.path.join(self.__shard_dir(), filename)
+
+    def __write_shards(self, keys):
+        """
+        Returns the writes of the shards holding keys, or of every shard
+        when keys is None.
+
+        Classes whose files were written with another bucket count are
+        rewritten whole and their old files removed.
+        """
+        if keys is None:
+            names = set(self.__by_class) | self.__stale
+            shards = None
+        else:
+            shards = {self.__shard_of(key) for key in keys}
+            names = {name for name, bucket in shards} | self.__stale
+        ops = [partial(os.makedirs, self.__shard_dir(), exist_ok=True)]
+        written = set()
+        for name in names:
+            self.__ensure_loaded(name)
+            whole = shards is None or name in self.__stale
+            groups = {}
+            if self.__shards == 1:
+                groups[(name, None)] = list(self.__by_class.get(name, ()))
+            else:
+                for bucket in range(self.__shards):
+                    if whole or (name, bucket) in shards:
+                        groups[(name, bucket)] = []
+                for key in self.__by_class.get(name, ()):
+                    group = groups.get(self.__shard_of(key))
+                    if group is not None:
+                        group.append(key)
+            for shard, shard_keys in groups.items():
+                path = self.__shard_path(shard)
+                written.add(path)
+                if shard_keys:
+                    chunks = [self.__fragment(key) for key in shard_keys]
+                    ops.append(partial(_atomic_write, path,
+                                       ("{", ", ".join(chunks), "}"),
+                                       self.__durability))
+                else:
+                    ops.append(partial(_remove, path))
+        for name in self.__stale:
+            for path in self.__list_shards().get(name, ()):
+                if path not in written:
+                    ops.append(partial(_remove, path))
+        self.__stale.clear()
+        return ops
+
+    def __list_shards(self):
+        """Returns {class name: [shard paths]} found in the shard directory"""
+        found = {}
+        directory = self.__shard_dir()
+        for filename in sorted(os.listdir(directory)):
+            parts = filename.split('.')
+            if parts[-1] != "json" or len(parts) not in (2, 3):
+                continue
+            found.setdefault(parts[0], []).append(
+                os.path.join(directory, filename))
+        return found
+
+    def __ensure_loaded(self, name=None):
+        """Reads the shards of a class (all classes when name is None) not loaded yet"""
+        if not self.__unloaded:
+            return
+        names = list(self.__unloaded) if name is None else [name]
+        classes = self.classes()
+        for class_name in names:
+            paths = self.__unloaded.pop(class_name, None)
+            if not paths:
+                continue
+            before = len(self.__objects)
+            for path in paths:
+                with open(path, 'r') as f:
+                    for key, value in _iter_records(f):
+                        self.__load(classes, key, value)
+            self.__persisted += len(self.__objects) - before
+
+    def __log_path(self):
+        """Returns the path of the journal kept next to the snapshot"""
+        return f"{self.__file_path}.log"
+
+    def __append_journal(self):
+        """
+        Encodes one record per pending mutation and returns their append.
+
+        When the journal would reach compact_after records, the writes of
+        a compaction are returned instead.
+        """
+        if not self.__pending:
+            return []
+        if self.__log_records + len(self.__pending) >= self.__compact_after:
+            return self.__compact()
+        lines = []
+        for key, op in self.__pending.items():
+            obj = self.__objects.get(key)
+            if obj is None:
+                record = {"op": "destroy", "key": key}
+            else:
+                record = {"op": op, "key": key, "value": obj.to_dict()}
+            lines.append(json.dumps(record) + "\n")
+        self.__log_records += len(self.__pending)
+        self.__pending.clear()
+        return [partial(self.__write_journal, lines)]
+
+    def __write_journal(self, lines):
+        """Appends encoded records to the journal"""
+        created = not os.path.exists(self.__log_path())
+        with open(self.__log_path(), 'a') as file:
+            file.writelines(lines)
+            file.flush()
+            if self.__durability != "none":
+                os.fsync(file.fileno())
+        if created and self.__durability == "dir":
+            _fsync_dir(self.__log_path())
 
     def classes(self):
         """Returns a dictionary of valid classes and their references"""
@@ -55,35 +1363,231 @@ class FileStorage:
                    "Amenity": Amenity,
                    "Place": Place,
                    "Review": Review}
+        if self.compact_models:
+            from models.compact import compact
+            classes = {name: compact(klass)
+                       for name, klass in classes.items()}
         return classes
+
     def reload(self):
         """Deserializes the JSON file to __objects (if the file exists)"""
-        if not os.path.isfile(FileStorage.__file_path):
+        # migrating a single-file store to shards writes the new files
+        migrate = bool(self.__shards) and not os.path.isdir(self.__shard_dir())
+        with self.__io_lock, self.__locked_files(exclusive=migrate):
+            with self.__lock.write():
+                ops = self.__reload()
+            self.__run(ops, {})
+
+    def refresh(self):
+        """
+        Loads what other processes saved since the last load or save.
+
+        When none of the store files changed (same inode, size and mtime)
+        only a stat() of each is done. Otherwise only the changed files
+        are read back: the new records of a journal that grew, or the
+        shards that were rewritten. Objects whose updated_at is the same
+        as on disk keep their instance, and objects with unsaved changes
+        are left alone.
+
+        Returns:
+            bool: True if the store had changed.
+        """
+        if self.__disk_state() == self.__state:
+            return False
+        with self.__io_lock, self.__locked_files(exclusive=False):
+            with self.__lock.write():
+                return self.__refresh()
+
+    def __disk_state(self):
+        """Returns {path: stamp} of the store files that exist"""
+        paths = [self.__file_path, self.__log_path()]
+        if self.__shards and os.path.isdir(self.__shard_dir()):
+            for shard_paths in self.__list_shards().values():
+                paths.extend(shard_paths)
+        state = {}
+        for path in paths:
+            stamp = _stamp(path)
+            if stamp is not None:
+                state[path] = stamp
+        return state
+
+    def __refresh(self):
+        """Merges the store files that changed since they were last seen"""
+        state = self.__disk_state()
+        if state == self.__state:
+            return False
+        old, self.__state = self.__state, state
+        changed = {path for path in set(state) | set(old)
+                   if state.get(path) != old.get(path)}
+        classes = self.classes()
+        before = len(self.__objects)
+        log = self.__log_path()
+        replay = self.__file_path in changed and not self.__shards
+        if self.__shards:
+            listing = (self.__list_shards()
+                       if os.path.isdir(self.__shard_dir()) else {})
+            for name in self.__unloaded:
+                self.__unloaded[name] = listing.get(name, [])
+            for path in sorted(changed - {self.__file_path, log}):
+                self.__merge_shard(classes, path)
+        elif replay:
+            binary = self.__snapshot_format()[0]
+            self.__merge(classes, self.__snapshot_records(binary),
+                         set(self.__objects), decoded=binary)
+        if replay or log in changed:
+            start = self.__log_offset
+            if (replay or old.get(log) is None or state.get(log) is None
+                    or state[log][0] != old[log][0] or state[log][1] < start):
+                start = 0
+            self.__read_log(classes, start, merge=True)
+        self.__persisted += len(self.__objects) - before
+        self.__columns_stale.update(self.__by_class)
+        return True
+
+    def __merge_shard(self, classes, path):
+        """Merges one shard file that changed, unless its class is not loaded yet"""
+        parts = os.path.basename(path).split('.')
+        name = parts[0]
+        if name in self.__unloaded:
             return
+        shard = (name, int(parts[1]) if len(parts) == 3 else None)
+        known = {key for key in self.__by_class.get(name, ())
+                 if self.__shard_of(key) == shard}
+        records = []
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                records = list(_iter_records(f))
+        self.__merge(classes, records, known)
+
+    def __merge(self, classes, records, known, decoded=False):
+        """
+        Applies records read back from disk over __objects.
+
+        Pending keys keep their local state. The keys of known missing
+        from records were deleted by another process.
+        """
+        seen = set()
+        for key, value in records:
+            seen.add(key)
+            if key in self.__pending or self.__unchanged(key, value):
+                continue
+            self.__load(classes, key, value, decoded)
+        for key in known - seen:
+            if key not in self.__pending:
+                self.__drop(key)
+
+    def __unchanged(self, key, value):
+        """Tells whether the object at key has the updated_at of a record"""
+        current = self.__objects.get(key)
+        if current is None:
+            return False
+        if type(current) is dict:
+            stored = current.get("updated_at")
+        else:
+            stored = getattr(current, "updated_at", None)
+        return (stored is not None
+                and _timestamp(stored) == _timestamp(value.get("updated_at")))
+
+    def __drop(self, key):
+        """Removes key from __objects and its indexes"""
+        self.__objects.pop(key, None)
+        self.__unindex(key)
+        self.__fragments.pop(key, None)
+
+    def __reload(self):
+        """Loads the stored objects and returns the writes of a migration"""
+        classes = self.classes()
+        self.__by_class = {}
+        self.__filled = set()
+        for indexes in self.__indexes.values():
+            for index in indexes:
+                index.clear()
+        for key in self.__objects:
+            self.__index(key)
+        migrate = (self.__shards and not os.path.isdir(self.__shard_dir())
+                   and os.path.isfile(self.__file_path))
+        if self.__shards and not migrate:
+            self.__persisted = len(self.__objects)
+            self.__unloaded = {}
+            self.__stale = set()
+            if os.path.isdir(self.__shard_dir()):
+                self.__unloaded = self.__list_shards()
+            expected = 2 if self.__shards == 1 else 3
+            for name, paths in self.__unloaded.items():
+                if any(len(os.path.basename(path).split('.')) != expected
+                       for path in paths):
+                    self.__stale.add(name)
+        else:
+            self.__read_snapshot(classes)
+        self.__read_log(classes, 0)
+        if not self.__shards:
+            self.__persisted = len(self.__objects)
+        self.__columns_stale = {name for name, klass in classes.items()
+                                if getattr(klass, "_columns", None)
+                                and self.__columns_outdated(name)}
+        self.__state = self.__disk_state()
+        if not migrate:
+            return []
+        ops = self.__compact()
+        ops.append(partial(os.replace, self.__file_path,
+                           f"{self.__file_path}.migrated"))
+        return ops
+
+    def __load(self, classes, key, value, decoded=False):
+        """
+        Builds the instance for one stored record and registers it.
+
+        A decoded record (from a binary snapshot) already holds datetime
+        objects, so its instance is filled directly instead of going
+        through the kwargs constructor and its per-attribute hooks.
+        """
+        if self.__lazy:
+            self.__objects[key] = value
+            self.__has_raw = True
+        elif decoded:
+            klass = classes[key.partition('.')[0]]
+            obj = klass.__new__(klass)
+            value.pop("__class__", None)
+            obj._set_state(value)
+            self.__objects[key] = obj
+        else:
+            class_name, obj_id = key.split('.')
+            self.__objects[key] = classes[class_name]._from_stored(value)
+        self.__index(key)
+        self.__pending.pop(key, None)
+        self.__fragments.pop(key, None)
+
+    def __read_log(self, classes, start, merge=False):
+        """
+        Applies the journal records found after byte offset start.
+
+        Reading from 0 replays the whole journal over the loaded snapshot.
+        A merge leaves the objects with pending changes alone.
+        """
+        if start == 0:
+            self.__log_records = 0
+        offset = start
         try:
-            with open(FileStorage.__file_path, 'r') as f:
-                obj_dict = json.load(f)
-                from models.base_model import BaseModel
-                from models.user import User
-                from models.state import State
-                from models.city import City
-                from models.amenity import Amenity
-                from models.place import Place
-                from models.review import Review
-                classes = {
-                    'BaseModel': BaseModel,
-                    'User': User,
-                    'State': State,
-                    'City': City,
-                    'Amenity': Amenity,
-                    'Place': Place,
-                    'Review': Review
-                }
-                for key, value in obj_dict.items():
-                    class_name, obj_id = key.split('.')
-                    cls = classes[class_name]
-                    new_obj = cls(**value)
-                    self.new(new_obj)
+            with open(self.__log_path(), 'rb') as f:
+                f.seek(start)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a crash mid-append leaves at most one torn record
+                        continue
+                    key = record["key"]
+                    self.__ensure_loaded(key.partition('.')[0])
+                    self.__log_records += 1
+                    if merge and key in self.__pending:
+                        continue
+                    if record["op"] == "destroy":
+                        self.__drop(key)
+                    else:
+                        self.__load(classes, key, record["value"])
         except FileNotFoundError:
-            pass
-
+            offset = 0
+        self.__log_offset = offset
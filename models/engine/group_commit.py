@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Module for the background writer that merges close save requests."""
+
+import threading
+
+
+class GroupCommitWriter:
+    """
+    Runs a write function on a background thread, once per group of requests.
+
+    The first request wakes the thread, which then waits window seconds
+    for more requests before calling write() once for all of them. A
+    request made while a write is running is served by the next write.
+
+    Attributes:
+        window (float): Seconds to wait for more requests before writing.
+    """
+
+    def __init__(self, write, window):
+        """
+        Starts the writer thread.
+
+        Args:
+            write (callable): Persists everything requested so far.
+            window (float): Seconds to wait for more requests.
+        """
+        self.window = window
+        self.__write = write
+        self.__condition = threading.Condition()
+        self.__requested = 0
+        self.__written = 0
+        self.__writes = 0
+        self.__largest = 0
+        self.__error = None
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__run, daemon=True,
+                                         name="storage-group-commit")
+        self.__thread.start()
+
+    def request(self):
+        """
+        Asks for a write and returns without waiting for it.
+
+        Raises:
+            RuntimeError: If the writer was closed.
+        """
+        with self.__condition:
+            if self.__closed:
+                raise RuntimeError("group commit writer is closed")
+            self.__requested += 1
+            self.__condition.notify_all()
+
+    def flush(self):
+        """
+        Waits until every request made so far has been written.
+
+        Raises:
+            Exception: The error of a failed write since the last flush().
+        """
+        with self.__condition:
+            target = self.__requested
+            self.__condition.wait_for(
+                lambda: self.__written >= target
+                or not self.__thread.is_alive())
+            error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Writes the outstanding requests and stops the thread"""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join()
+        self.flush()
+
+    def stats(self):
+        """
+        Returns the merge counters.
+
+        Returns:
+            dict: requests (save requests received), writes (writes done),
+                merged (requests served by another request's write) and
+                largest (most requests served by one write).
+        """
+        with self.__condition:
+            return {"requests": self.__requested, "writes": self.__writes,
+                    "merged": self.__written - self.__writes,
+                    "largest": self.__largest}
+
+    def __run(self):
+        """Waits for requests and writes them group by group"""
+        condition = self.__condition
+        while True:
+            with condition:
+                condition.wait_for(lambda: self.__requested > self.__written
+                                   or self.__closed)
+                if self.__requested == self.__written:
+                    return
+                condition.wait_for(lambda: self.__closed, self.window)
+                target = self.__requested
+            try:
+                self.__write()
+                error = None
+            except Exception as exc:
+                error = exc
+            with condition:
+                self.__largest = max(self.__largest, target - self.__written)
+                self.__written = target
+                self.__writes += 1
+                if error is not None:
+                    self.__error = error
+                condition.notify_all()
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""Module for the secondary indexes kept by the storage engine."""
+
+import heapq
+import math
+from bisect import bisect_left, bisect_right, insort
+
+# sorts after every <class name>.id key, closes inclusive upper bounds
+_LAST_KEY = chr(0x10FFFF)
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Returns the great-circle distance between two points.
+
+    Args:
+        lat1 (float): Latitude of the first point, in degrees.
+        lon1 (float): Longitude of the first point, in degrees.
+        lat2 (float): Latitude of the second point, in degrees.
+        lon2 (float): Longitude of the second point, in degrees.
+
+    Returns:
+        float: The distance in kilometers.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2)
+         * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def read_attribute(obj, attr, default=None):
+    """
+    Reads attr from an instance or from a raw (not yet built) record.
+
+    Args:
+        obj (BaseModel or dict): The object or its raw record.
+        attr (str): The attribute name.
+        default: The value used when the attribute is missing.
+
+    Returns:
+        The attribute value.
+    """
+    if type(obj) is dict:
+        return obj.get(attr, default)
+    return getattr(obj, attr, default)
+
+
+class HashIndex:
+    """
+    Maps each value of one attribute to the keys of the objects holding it.
+
+    Attributes:
+        attrs (tuple): The attribute names the index watches.
+        default: The class-level default of the attribute.
+    """
+
+    def __init__(self, attr, default=None):
+        """
+        Initializes an empty index.
+
+        Args:
+            attr (str): The indexed attribute.
+            default: The value of objects that never set the attribute.
+        """
+        self.attrs = (attr,)
+        self.default = default
+        self.__keys = {}
+        self.__values = {}
+
+    def value_of(self, obj):
+        """Returns the indexed value of obj"""
+        return read_attribute(obj, self.attrs[0], self.default)
+
+    def update(self, key, value):
+        """
+        Stores key under value, dropping the previous entry of key.
+
+        Unhashable values (lists, dicts) are not indexed.
+
+        Args:
+            key (str): The <class name>.id key of the object.
+            value: The current attribute value.
+        """
+        self.remove(key)
+        try:
+            self.__keys.setdefault(value, {})[key] = None
+        except TypeError:
+            return
+        self.__values[key] = value
+
+    def remove(self, key):
+        """
+        Drops key from the index.
+
+        Args:
+            key (str): The <class name>.id key of the object.
+        """
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        bucket = self.__keys[value]
+        del bucket[key]
+        if not bucket:
+            del self.__keys[value]
+
+    def clear(self):
+        """Drops every entry"""
+        self.__keys = {}
+        self.__values = {}
+
+    def fill(self, entries):
+        """
+        Replaces every entry with the given ones.
+
+        Args:
+            entries (iterable): (key, value) pairs, as given to update().
+        """
+        self.clear()
+        for key, value in entries:
+            self.update(key, value)
+
+    def lookup(self, value):
+        """
+        Returns the keys of the objects whose attribute equals value.
+
+        Args:
+            value: The value to look for.
+
+        Returns:
+            dict: The matching keys (used as an ordered set).
+        """
+        try:
+            return self.__keys.get(value, {})
+        except TypeError:
+            return {}
+
+
+class RangeIndex:
+    """
+    Keeps the keys of a class sorted by one numeric attribute.
+
+    Entries are (value, key) pairs in a bisect-maintained list, so range
+    queries and ordered iteration never look at objects outside the range.
+
+    Attributes:
+        attrs (tuple): The attribute names the index watches.
+        default: The class-level default of the attribute.
+    """
+
+    def __init__(self, attr, default=None):
+        """
+        Initializes an empty index.
+
+        Args:
+            attr (str): The indexed attribute.
+            default: The value of objects that never set the attribute.
+        """
+        self.attrs = (attr,)
+        self.default = default
+        self.__entries = []
+        self.__values = {}
+
+    def value_of(self, obj):
+        """Returns the indexed value of obj"""
+        return read_attribute(obj, self.attrs[0], self.default)
+
+    def update(self, key, value):
+        """
+        Moves key to the position of value.
+
+        Values that are not int or float (e.g. strings set from the
+        console) are left out of the index.
+
+        Args:
+            key (str): The <class name>.id key of the object.
+            value: The current attribute value.
+        """
+        self.remove(key)
+        if type(value) not in (int, float) or value != value:
+            return
+        insort(self.__entries, (value, key))
+        self.__values[key] = value
+
+    def remove(self, key):
+        """
+        Drops key from the index.
+
+        Args:
+            key (str): The <class name>.id key of the object.
+        """
+        if key not in self.__values:
+            return
+        entry = (self.__values.pop(key), key)
+        del self.__entries[bisect_left(self.__entries, entry)]
+
+    def clear(self):
+        """Drops every entry"""
+        self.__entries = []
+        self.__values = {}
+
+    def fill(self, entries):
+        """
+        Replaces every entry with the given ones, sorting them once.
+
+        Inserting them one by one with update() would shift the list on
+        every insertion.
+
+        Args:
+            entries (iterable): (key, value) pairs, as given to update().
+        """
+        self.__values = {key: value for key, value in entries
+                         if type(value) in (int, float) and value == value}
+        self.__entries = sorted((value, key)
+                                for key, value in self.__values.items())
+
+    def range(self, lo=None, hi=None):
+        """
+        Returns the keys whose value is between lo and hi (both inclusive).
+
+        Args:
+            lo (int or float): The lower bound, None for no bound.
+            hi (int or float): The upper bound, None for no bound.
+
+        Returns:
+            list: The matching keys, by ascending value.
+        """
+        start = 0 if lo is None else bisect_left(self.__entries, (lo,))
+        end = (len(self.__entries) if hi is None
+               else bisect_right(self.__entries, (hi, _LAST_KEY)))
+        return [key for value, key in self.__entries[start:end]]
+
+    def ordered(self, reverse=False):
+        """
+        Yields every indexed key by ascending (or descending) value.
+
+        Args:
+            reverse (bool): Start from the largest value.
+        """
+        entries = reversed(self.__entries) if reverse else self.__entries
+        for value, key in entries:
+            yield key
+
+    def lookup(self, value):
+        """
+        Returns the keys of the objects whose attribute equals value.
+
+        Args:
+            value: The value to look for.
+
+        Returns:
+            dict: The matching keys (used as an ordered set).
+        """
+        if type(value) not in (int, float):
+            return {}
+        return dict.fromkeys(self.range(value, value))
+
+
+class GridIndex:
+    """
+    Buckets the keys of a class into a uniform latitude/longitude grid.
+
+    Radius, bounding-box and nearest-neighbour queries only visit the
+    cells that can hold a match and compute distances for their points.
+
+    Attributes:
+        attrs (tuple): The (latitude, longitude) attribute names.
+        default (tuple): The class-level defaults of the attributes.
+        cell_size (float): The side of a grid cell, in degrees.
+    """
+
+    def __init__(self, attrs=("latitude", "longitude"), default=(None, None),
+                 cell_size=0.1):
+        """
+        Initializes an empty index.
+
+        Args:
+            attrs (tuple): The latitude and longitude attribute names.
+            default (tuple): The values of objects that never set them.
+            cell_size (float): The side of a grid cell, in degrees.
+        """
+        self.attrs = tuple(attrs)
+        self.default = tuple(default)
+        self.cell_size = cell_size
+        self.__columns = math.ceil(360 / cell_size)
+        self.__cells = {}
+        self.__where = {}
+
+    def value_of(self, obj):
+        """Returns the (latitude, longitude) of obj"""
+        return (read_attribute(obj, self.attrs[0], self.default[0]),
+                read_attribute(obj, self.attrs[1], self.default[1]))
+
+    def __cell(self, lat, lon):
+        """Returns the (row, column) of the cell holding a point"""
+        return (math.floor((lat + 90) / self.cell_size),
+                math.floor((lon + 180) / self.cell_size) % self.__columns)
+
+    def update(self, key, value):
+        """
+        Moves key to the cell of its new coordinates.
+
+        Points with non-numeric or out-of-range coordinates are left out.
+
+        Args:
+            key (str): The <class name>.id key of the object.
+            value (tuple): The current (latitude, longitude).
+        """
+        self.remove(key)
+        lat, lon = value
+        if type(lat) not in (int, float) or type(lon) not in (int, float):
+            return
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return
+        cell = self.__cell(lat, lon)
+        self.__cells.setdefault(cell, {})[key] = (lat, lon)
+        self.__where[key] = cell
+
+    def remove(self, key):
+        """
+        Drops key from the index.
+
+        Args:
+            key (str): The <class name>.id key of the object.
+        """
+        cell = self.__where.pop(key, None)
+        if cell is None:
+            return
+        points = self.__cells[cell]
+        del points[key]
+        if not points:
+            del self.__cells[cell]
+
+    def clear(self):
+        """Drops every entry"""
+        self.__cells = {}
+        self.__where = {}
+
+    def fill(self, entries):
+        """
+        Replaces every entry with the given ones.
+
+        Args:
+            entries (iterable): (key, value) pairs, as given to update().
+        """
+        self.clear()
+        for key, value in entries:
+            self.update(key, value)
+
+    def __points(self, rows, columns):
+        """Yields (key, (lat, lon)) for every point in the given cells"""
+        for row in rows:
+            for column in columns:
+                points = self.__cells.get((row, column % self.__columns))
+                if points:
+                    yield from points.items()
+
+    def __column_span(self, west, east):
+        """Returns the columns covering west..east, wrapping if west > east"""
+        if east - west >= 360:
+            return range(self.__columns)
+        first = math.floor((west + 180) / self.cell_size)
+        last = math.floor((east + 180) / self.cell_size)
+        if west > east:
+            # west and east may share a cell: the box still goes round
+            last += self.__columns
+        if last - first >= self.__columns:
+            return range(self.__columns)
+        return range(first, last + 1)
+
+    def within_box(self, south, west, north, east):
+        """
+        Returns the keys whose point lies inside a bounding box.
+
+        A box with west > east crosses the 180th meridian.
+
+        Args:
+            south (float): The minimum latitude.
+            west (float): The western longitude.
+            north (float): The maximum latitude.
+            east (float): The eastern longitude.
+
+        Returns:
+            list: The matching keys.
+        """
+        rows = range(self.__cell(max(south, -90), 0)[0],
+                     self.__cell(min(north, 90), 0)[0] + 1)
+        wraps = west > east
+        found = []
+        for key, (lat, lon) in self.__points(rows,
+                                             self.__column_span(west, east)):
+            if not south <= lat <= north:
+                continue
+            if (west <= lon or lon <= east) if wraps else west <= lon <= east:
+                found.append(key)
+        return found
+
+    def within_radius(self, lat, lon, km):
+        """
+        Returns the keys within km kilometers of a point, nearest first.
+
+        Args:
+            lat (float): The latitude of the center.
+            lon (float): The longitude of the center.
+            km (float): The radius in kilometers.
+
+        Returns:
+            list: (distance, key) pairs sorted by distance.
+        """
+        dlat = km / _KM_PER_DEGREE
+        south, north = lat - dlat, lat + dlat
+        if south <= -90 or north >= 90:
+            west, east = -180, 180
+        else:
+            cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+            dlon = min(180, dlat / cos_lat)
+            west, east = lon - dlon, lon + dlon
+        rows = range(self.__cell(max(south, -90), 0)[0],
+                     self.__cell(min(north, 90), 0)[0] + 1)
+        found = []
+        for key, point in self.__points(rows, self.__column_span(west, east)):
+            distance = haversine(lat, lon, point[0], point[1])
+            if distance <= km:
+                found.append((distance, key))
+        found.sort()
+        return found
+
+    def nearest(self, lat, lon, k=1):
+        """
+        Returns the k keys closest to a point.
+
+        Rings of cells are searched outwards from the cell of the point
+        until no unvisited cell can hold anything closer than the k-th
+        point found so far. Once the rings have visited more cells than
+        there are occupied ones (sparse or far away points), the search
+        goes on over the occupied cells only, nearest bound first.
+
+        Args:
+            lat (float): The latitude of the point.
+            lon (float): The longitude of the point.
+            k (int): The number of neighbours.
+
+        Returns:
+            list: (distance, key) pairs sorted by distance.
+        """
+        row, column = self.__cell(lat, lon)
+        rows = math.floor(180 / self.cell_size) + 1
+        best = []
+        seen = set()
+        radius = 0
+        while True:
+            for cell_row in range(row - radius, row + radius + 1):
+                if not 0 <= cell_row < rows:
+                    continue
+                on_edge = abs(cell_row - row) == radius
+                step = 1 if on_edge else 2 * radius
+                for cell_column in range(column - radius,
+                                         column + radius + 1, step):
+                    cell = (cell_row, cell_column % self.__columns)
+                    if cell in seen:
+                        continue
+                    seen.add(cell)
+                    for key, point in self.__cells.get(cell, {}).items():
+                        entry = (-haversine(lat, lon, point[0], point[1]), key)
+                        if len(best) < k:
+                            heapq.heappush(best, entry)
+                        elif entry > best[0]:
+                            heapq.heapreplace(best, entry)
+            covered = len(best) == len(self.__where) or (
+                2 * radius + 1 >= self.__columns
+                and row - radius <= 0 and row + radius >= rows - 1)
+            if covered or (len(best) == k and
+                           -best[0][0] <= self.__bound(lat, lon, row, column,
+                                                       radius)):
+                break
+            if len(seen) > len(self.__cells):
+                return self.__nearest_occupied(lat, lon, k)
+            radius += 1
+        return sorted((-distance, key) for distance, key in best)
+
+    def __nearest_occupied(self, lat, lon, k):
+        """Returns the k nearest points, searching the occupied cells only"""
+        ranked = sorted((self.__cell_bound(lat, lon, cell), cell)
+                        for cell in self.__cells)
+        best = []
+        for bound, cell in ranked:
+            if len(best) == k and bound > -best[0][0]:
+                break
+            for key, point in self.__cells[cell].items():
+                entry = (-haversine(lat, lon, point[0], point[1]), key)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+        return sorted((-distance, key) for distance, key in best)
+
+    def __cell_bound(self, lat, lon, cell):
+        """Returns a lower bound of the distance from a point to a cell"""
+        size = self.cell_size
+        south = cell[0] * size - 90
+        north = south + size
+        west = cell[1] * size - 180
+        east = west + size
+        dlat = max(0.0, south - lat, lat - north)
+        lon = (lon + 180) % 360 - 180
+        if west <= lon <= east:
+            dlon = 0.0
+        else:
+            dlon = min((west - lon) % 360, (lon - east) % 360)
+        cos_min = max(0.0, min(math.cos(math.radians(south)),
+                               math.cos(math.radians(north))))
+        # the haversine terms, with the smallest cos of the cell latitudes
+        a = (math.sin(math.radians(dlat) / 2) ** 2
+             + math.cos(math.radians(lat)) * cos_min
+             * math.sin(math.radians(dlon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+    def __bound(self, lat, lon, row, column, radius):
+        """Returns a lower bound of the distance to any cell outside the searched rings"""
+        size = self.cell_size
+        south = (row - radius) * size - 90
+        north = (row + radius + 1) * size - 90
+        west = (column - radius) * size - 180
+        east = (column + radius + 1) * size - 180
+        lon = (lon + 180) % 360 - 180
+        if lon < west:
+            lon += 360
+        bounds = []
+        if south > -90:
+            bounds.append((lat - south) * _KM_PER_DEGREE)
+        if north < 90:
+            bounds.append((north - lat) * _KM_PER_DEGREE)
+        if east - west < 360:
+            cos_max = math.cos(math.radians(min(90, max(abs(south),
+                                                        abs(north)))))
+            dlon = math.radians(min(lon - west, east - lon))
+            bounds.append(2 * EARTH_RADIUS_KM
+                          * math.asin(min(1.0, cos_max * math.sin(dlon / 2))))
+        return min(bounds) if bounds else math.inf
+
+
+INDEX_TYPES = {"hash": HashIndex, "range": RangeIndex, "grid": GridIndex}
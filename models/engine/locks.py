@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Module for the locks guarding the state of the storage engine."""
+
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock()
+    fcntl = None
+
+
+class ExclusiveLock:
+    """
+    A reentrant lock with the interface of ReadWriteLock.
+
+    Readers and writers all take the same lock. It is what the storage
+    uses outside thread-safe mode, where it only has to keep the group
+    commit writer and the caller apart.
+    """
+
+    def __init__(self):
+        """Initializes the lock"""
+        self.__lock = threading.RLock()
+
+    def read(self):
+        """Returns the context manager of a read section"""
+        return self.__lock
+
+    def write(self):
+        """Returns the context manager of a write section"""
+        return self.__lock
+
+
+class ReadWriteLock:
+    """
+    Lets any number of threads read at once, or one thread write.
+
+    Waiting writers go first, so a steady flow of readers cannot starve
+    them. Both sides are reentrant: a thread holding the write lock may
+    take either lock again, and a reader may read again. A reader cannot
+    upgrade to the write lock.
+    """
+
+    def __init__(self):
+        """Initializes the lock"""
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = {}
+        self.__writer = None
+        self.__depth = 0
+        self.__waiting = 0
+
+    @contextmanager
+    def read(self):
+        """Holds a read section for the duration of the with block"""
+        me = threading.get_ident()
+        with self.__condition:
+            if self.__writer != me and me not in self.__readers:
+                self.__condition.wait_for(
+                    lambda: self.__writer is None and not self.__waiting)
+            self.__readers[me] = self.__readers.get(me, 0) + 1
+        try:
+            yield
+        finally:
+            with self.__condition:
+                depth = self.__readers.pop(me) - 1
+                if depth:
+                    self.__readers[me] = depth
+                elif not self.__readers:
+                    self.__condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """
+        Holds the write lock for the duration of the with block.
+
+        Raises:
+            RuntimeError: If the thread only holds a read section.
+        """
+        me = threading.get_ident()
+        with self.__condition:
+            if self.__writer != me:
+                if me in self.__readers:
+                    raise RuntimeError("cannot upgrade a read lock")
+                self.__waiting += 1
+                try:
+                    self.__condition.wait_for(
+                        lambda: self.__writer is None and not self.__readers)
+                finally:
+                    self.__waiting -= 1
+                self.__writer = me
+            self.__depth += 1
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__depth -= 1
+                if not self.__depth:
+                    self.__writer = None
+                    self.__condition.notify_all()
+
+
+class FileLock:
+    """
+    An advisory lock shared by the processes using the same store.
+
+    The lock is taken with flock() on a separate lock file, so the files
+    it protects can be replaced by a rename while it is held. Any number
+    of processes may hold the shared side, or one the exclusive side.
+    Where fcntl is missing (Windows) the sections do not lock anything.
+
+    Attributes:
+        path (str): The lock file, created on first use.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes the lock.
+
+        Args:
+            path (str): The lock file.
+        """
+        self.path = path
+
+    def shared(self):
+        """Returns the context manager of a shared (reading) section"""
+        return self.__held(None if fcntl is None else fcntl.LOCK_SH)
+
+    def exclusive(self):
+        """Returns the context manager of an exclusive (writing) section"""
+        return self.__held(None if fcntl is None else fcntl.LOCK_EX)
+
+    @contextmanager
+    def __held(self, operation):
+        """Holds the lock in the given flock() mode for the with block"""
+        if operation is None:
+            yield
+            return
+        with open(self.path, 'a') as file:
+            fcntl.flock(file.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Module for the undo log that lets a storage batch be rolled back."""
+
+
+def _state_of(obj):
+    """Returns the attributes of an instance, or a raw record itself"""
+    return obj if type(obj) is dict else obj._state()
+
+
+class UndoLog:
+    """
+    Remembers the state of every key before its first change in a batch.
+
+    The storage engine calls remember() before it replaces, removes or
+    lets an attribute of a stored object change, and restore() puts the
+    remembered objects and attribute values back.
+    """
+
+    def __init__(self):
+        """Initializes an empty log"""
+        self.__before = {}
+
+    def remember(self, key, obj):
+        """
+        Records the object stored at key, if key was not recorded yet.
+
+        Args:
+            key (str): The <class name>.id key.
+            obj (BaseModel or dict): The object stored at key, None if none.
+        """
+        if key not in self.__before:
+            state = None if obj is None else dict(_state_of(obj))
+            self.__before[key] = (obj, state)
+
+    def restore(self):
+        """
+        Puts the remembered attribute values back into their objects.
+
+        Attributes are written directly to the instance dicts, so no
+        storage hook runs.
+
+        Returns:
+            list: (key, object) pairs; the object is None for keys that
+                held nothing before the batch.
+        """
+        restored = []
+        for key, (obj, state) in self.__before.items():
+            if type(obj) is dict:
+                obj.clear()
+                obj.update(state)
+            elif obj is not None:
+                obj._set_state(state)
+            restored.append((key, obj))
+        self.__before.clear()
+        return restored
@@ -22,15 +22,21 @@ class Place(BaseModel):
         longitude (float): Longitude of the place's location.
         amenity_ids (list): List of amenity IDs associated with the place.
     """
-    city_id = ""
-    user_id = ""
-    name = ""
-    description = ""
-    number_rooms = 0
-    number_bathrooms = 0
-    max_guest = 0
-    price_by_night = 0
-    latitude = 0.0
-    longitude = 0.0
-    amenity_ids = []
-
+    city_id: str = ""
+    user_id: str = ""
+    name: str = ""
+    description: str = ""
+    number_rooms: int = 0
+    number_bathrooms: int = 0
+    max_guest: int = 0
+    price_by_night: int = 0
+    latitude: float = 0.0
+    longitude: float = 0.0
+    amenity_ids: list = []
+    _indexes = {"city_id": "hash", "user_id": "hash",
+                "price_by_night": "range", "max_guest": "range",
+                "number_rooms": "range",
+                ("latitude", "longitude"): "grid"}
+    _columns = {"price_by_night": "q", "number_rooms": "q",
+                "number_bathrooms": "q", "max_guest": "q",
+                "latitude": "d", "longitude": "d"}
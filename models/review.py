@@ -13,7 +13,7 @@ class Review(BaseModel):
         user_id (str): ID of the user writing the review.
         text (str): Text content of the review.
     """
-    place_id = ""
-    user_id = ""
-    text = ""
-
+    place_id: str = ""
+    user_id: str = ""
+    text: str = ""
+    _indexes = {"place_id": "hash", "user_id": "hash"}
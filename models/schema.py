@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Module for the typed attribute schemas of the models.
+
+A model declares the type of its fields with class annotations, next to
+their defaults:
+
+    class Place(BaseModel):
+        number_rooms: int = 0
+        latitude: float = 0.0
+        amenity_ids: list = []
+
+schema(Place) compiles them, once per class, into a table of coercers.
+A coercer returns a value converted to the declared type, such as the
+string "3" read by the console for an int field. It raises ValueError
+for a value that cannot be converted, so the value never reaches the
+instance or the storage. Attribute names must be identifiers. The
+attributes a model does not declare keep their value as it is.
+
+created_at and updated_at are not part of the schema: the models and
+models.timestamps convert them.
+"""
+
+import json
+import math
+import re
+
+_INTEGER = re.compile(r"[+-]?[0-9]+")
+_schemas = {}
+
+
+def _to_int(value):
+    """Returns value as an int if it holds a whole number"""
+    kind = type(value)
+    if kind is int:
+        return value
+    if kind is float and value.is_integer():
+        return int(value)
+    if kind is str and _INTEGER.fullmatch(value.strip()):
+        return int(value)
+    raise TypeError
+
+
+def _to_float(value):
+    """Returns value as a finite float"""
+    kind = type(value)
+    if kind is float or kind is int or kind is str:
+        value = float(value)
+        if math.isfinite(value):
+            return value
+    raise TypeError
+
+
+def _to_str(value):
+    """Returns value as a str, numbers included"""
+    kind = type(value)
+    if kind is str:
+        return value
+    if kind is int or kind is float:
+        return str(value)
+    raise TypeError
+
+
+def _to_list(value):
+    """Returns value as a list, parsing a JSON array given as a string"""
+    kind = type(value)
+    if kind is list:
+        return value
+    if kind is tuple:
+        return list(value)
+    if kind is str:
+        value = json.loads(value)
+        if type(value) is list:
+            return value
+    raise TypeError
+
+
+def _to_dict(value):
+    """Returns value as a dict, parsing a JSON object given as a string"""
+    if type(value) is str:
+        value = json.loads(value)
+    if type(value) is dict:
+        return value
+    raise TypeError
+
+
+COERCERS = {int: _to_int, float: _to_float, str: _to_str, list: _to_list,
+            dict: _to_dict}
+
+
+class Schema:
+    """
+    The compiled field types of one model class.
+
+    Attributes:
+        fields (dict): The declared type of each field.
+    """
+
+    def __init__(self, fields):
+        """
+        Compiles the coercers of the fields.
+
+        Args:
+            fields (dict): Maps the field names to their types, one of
+                the keys of COERCERS.
+
+        Raises:
+            TypeError: If a type has no coercer.
+        """
+        self.fields = dict(fields)
+        self.__coercers = {}
+        for name, kind in self.fields.items():
+            if kind not in COERCERS:
+                raise TypeError(f"unsupported field type for {name}: {kind!r}")
+            self.__coercers[name] = COERCERS[kind]
+
+    def coerce(self, name, value):
+        """
+        Returns value converted to the declared type of the name field.
+
+        Args:
+            name (str): The attribute name.
+            value: The value to set.
+
+        Raises:
+            ValueError: If name is not an identifier, or value cannot be
+                converted to the field type.
+        """
+        coercer = self.__coercers.get(name)
+        if coercer is None:
+            if not name.isidentifier():
+                raise ValueError(f"invalid attribute name: {name!r}")
+            return value
+        try:
+            return coercer(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid {self.fields[name].__name__} for "
+                             f"{name}: {value!r}") from None
+
+    def coerce_record(self, record):
+        """
+        Returns a copy of a stored record with every value coerced.
+
+        Args:
+            record (dict): The attributes of an object, as given to the
+                kwargs constructor. A "__class__" entry is left out.
+
+        Raises:
+            ValueError: As coerce(), naming the first invalid attribute.
+        """
+        coerce = self.coerce
+        return {name: coerce(name, value) for name, value in record.items()
+                if name != "__class__"}
+
+
+def schema(cls):
+    """
+    Returns the schema of a model class, compiled on first use.
+
+    The annotations of cls and of its bases are the fields. A compact
+    class (see models.compact) has the schema of its regular model.
+
+    Args:
+        cls (type): A model class.
+
+    Returns:
+        Schema: The compiled schema.
+    """
+    compiled = _schemas.get(cls)
+    if compiled is not None:
+        return compiled
+    model = getattr(cls, "model", cls)
+    fields = {}
+    for base in reversed(model.__mro__):
+        fields.update(vars(base).get("__annotations__", {}))
+    compiled = _schemas[cls] = Schema(fields)
+    return compiled
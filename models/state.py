@@ -3,5 +3,5 @@
 from models.base_model import BaseModel
 class State(BaseModel):
     """State class inherits from BaseModel"""
-    name = ""
+    name: str = ""
 
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Module for the raw created_at/updated_at values of the models.
+
+By default created_at and updated_at are datetime attributes: every
+reload parses them from their ISO strings and every save formats them
+back. With epoch timestamps enabled (enable(), or HBNB_EPOCH_TIMESTAMPS=1)
+they are kept as they come instead: integer epoch microseconds when a
+model sets them, the ISO string when they are read from JSON. They turn
+into a datetime the first time they are read, so an object that is
+loaded and saved again without anyone looking at its timestamps never
+converts them, and its JSON record is unchanged. Until then the
+instance __dict__, and so str() of the instance, shows the raw value.
+
+Epoch microseconds count the local wall-clock time since 1970-01-01, as
+in the binary snapshots, so they convert to the datetime.now() of the
+same instant.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+FIELDS = ("created_at", "updated_at")
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+_enabled = False
+_hosts = []
+# (UTC second, local second) of the last now() call
+_clock = (None, None)
+# (local second, its ISO string) of the last isoformat() of an int
+_prefix = (None, None)
+
+
+class Timestamp:
+    """
+    Data descriptor of a created_at/updated_at attribute kept raw.
+
+    The stored value is whatever was assigned: epoch microseconds, an ISO
+    string or a datetime. Reading it returns a datetime, which replaces
+    the stored value without any storage hook.
+    """
+
+    def __init__(self, name, member=None):
+        """
+        Initializes the descriptor.
+
+        Args:
+            name (str): The attribute name.
+            member: The slot descriptor holding the value, None to keep
+                it in the instance __dict__.
+        """
+        self.name = name
+        self.member = member
+
+    def __get__(self, obj, objtype=None):
+        """Returns the value as a datetime, converting it once"""
+        if obj is None:
+            return self
+        value = self.raw(obj)
+        if type(value) is not datetime:
+            value = to_datetime(value)
+            self.__set__(obj, value)
+        return value
+
+    def __set__(self, obj, value):
+        """Stores value as it is"""
+        if self.member is not None:
+            self.member.__set__(obj, value)
+        else:
+            obj.__dict__[self.name] = value
+
+    def __delete__(self, obj):
+        """Removes the stored value"""
+        if self.member is not None:
+            self.member.__delete__(obj)
+            return
+        try:
+            del obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+    def raw(self, obj):
+        """
+        Returns the stored value without converting it.
+
+        Raises:
+            AttributeError: If the attribute is not set.
+        """
+        if self.member is not None:
+            return self.member.__get__(obj)
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+
+def enabled():
+    """Tells whether created_at and updated_at are kept raw"""
+    return _enabled
+
+
+def enable(on=True):
+    """
+    Turns epoch timestamps on or off for every model class.
+
+    Instances keep the values they hold, so switch it before any model
+    is built or loaded, as models/__init__.py does.
+
+    Args:
+        on (bool): True to keep the timestamps raw.
+    """
+    global _enabled
+    _enabled = on
+    for cls, members in _hosts:
+        _install(cls, members)
+
+
+def register(cls, members=None):
+    """
+    Makes enable() manage the timestamp attributes of a class.
+
+    Args:
+        cls (type): A class defining the model timestamps.
+        members (dict): The slot descriptors of created_at and
+            updated_at, for a class that keeps them in slots.
+    """
+    _hosts.append((cls, members))
+    _install(cls, members)
+
+
+def _install(cls, members):
+    """Puts the descriptors on cls, or puts back what they replaced"""
+    for name in FIELDS:
+        member = members[name] if members else None
+        if _enabled:
+            setattr(cls, name, Timestamp(name, member))
+        elif member is not None:
+            setattr(cls, name, member)
+        elif isinstance(vars(cls).get(name), Timestamp):
+            delattr(cls, name)
+
+
+def now():
+    """
+    Returns the current time, as epoch microseconds when enabled.
+
+    Returns:
+        int or datetime: The value for a new created_at/updated_at.
+    """
+    global _clock
+    if not _enabled:
+        return datetime.now()
+    seconds, micros = divmod(time.time_ns() // 1000, 1000000)
+    utc_second, local_second = _clock
+    if seconds != utc_second:
+        local_second = (datetime.fromtimestamp(seconds) - _EPOCH) // _SECOND
+        _clock = seconds, local_second
+    return local_second * 1000000 + micros
+
+
+def to_datetime(value):
+    """
+    Returns a raw timestamp as a datetime.
+
+    Args:
+        value (int, str or datetime): Epoch microseconds, an ISO string
+            or a datetime, which is returned unchanged.
+    """
+    if type(value) is int:
+        return _EPOCH + timedelta(microseconds=value)
+    if type(value) is str:
+        return datetime.fromisoformat(value)
+    return value
+
+
+def isoformat(value):
+    """
+    Returns a raw timestamp as the ISO string datetime.isoformat() gives.
+
+    Args:
+        value (int, str or datetime): Epoch microseconds, a datetime, or
+            an ISO string, which is returned unchanged.
+    """
+    global _prefix
+    if type(value) is str:
+        return value
+    if type(value) is not int:
+        return value.isoformat()
+    second, micros = divmod(value, 1000000)
+    cached_second, prefix = _prefix
+    if second != cached_second:
+        prefix = (_EPOCH + timedelta(seconds=second)).isoformat()
+        _prefix = second, prefix
+    return f"{prefix}.{micros:06d}" if micros else prefix
@@ -3,8 +3,8 @@
 from models.base_model import BaseModel
 class User(BaseModel):
     """User class inherits from BaseModel"""
-    email = ""
-    password = ""
-    first_name = ""
-    last_name = ""
+    email: str = ""
+    password: str = ""
+    first_name: str = ""
+    last_name: str = ""
 
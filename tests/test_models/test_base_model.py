@@ -95,6 +95,29 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(model.updated_at, datetime.fromisoformat("2023-01-01T00:00:00.000000"))
         self.assertEqual(model.name, "Test")
 
+    def test_to_dict_cache(self):
+        """
+        Test that to_dict() is cached until an attribute is set.
+        Ensures each call returns a new dict and a stored record is reused.
+        """
+        first = self.model.to_dict()
+        first["id"] = "changed"
+        self.assertIsNot(self.model._serialized, first)
+        self.assertEqual(self.model.to_dict()["id"], self.model.id)
+        self.model.name = "Test"
+        self.assertIsNone(self.model._serialized)
+        self.assertEqual(self.model.to_dict()["name"], "Test")
+        record = self.model.to_dict()
+        copy = BaseModel(**record)
+        self.assertEqual(copy._serialized, record)
+        self.assertEqual(copy.to_dict(), record)
+        copy.save()
+        self.assertNotEqual(copy.to_dict()["updated_at"], record["updated_at"])
+        copy.name = "Kept"
+        copy.to_dict()
+        del copy.name
+        self.assertNotIn("name", copy.to_dict())
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Module for testing the compact model classes.
+"""
+
+import os
+import unittest
+from models.compact import compact
+from models.engine.file_storage import FileStorage
+from models.engine.undo import UndoLog
+from models.place import Place
+from models.user import User
+
+
+class TestCompact(unittest.TestCase):
+    """
+    Test cases for the compact model classes.
+    """
+
+    def setUp(self):
+        """Builds a regular and a compact Place from the same record"""
+        self.record = {"id": "1", "created_at": "2024-05-21T09:52:28.980961",
+                       "updated_at": "2024-05-21T09:52:28.980961",
+                       "name": "Loft", "price_by_night": 80,
+                       "unknown": [1, 2], "__class__": "Place"}
+        self.place = Place(**self.record)
+        self.compact = compact(Place)(**self.record)
+
+    def tearDown(self):
+        """Removes the files written by the storage tests"""
+        for path in ("test_file.json", "test_file.json.Place.cols"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_class(self):
+        """Test that the compact class keeps the name and the fields"""
+        klass = compact(Place)
+        self.assertIs(compact(Place), klass)
+        self.assertEqual(klass.__name__, "Place")
+        self.assertIn("price_by_night", klass.__slots__)
+        self.assertEqual(klass._indexes, Place._indexes)
+        self.assertFalse(hasattr(self.compact, "__dict__"))
+
+    def test_attributes(self):
+        """Test defaults, slots and attributes without a slot"""
+        self.assertEqual(self.compact.price_by_night, 80)
+        self.assertEqual(self.compact.number_rooms, 0)
+        self.assertEqual(self.compact.unknown, [1, 2])
+        self.compact.nickname = "cosy"
+        self.assertEqual(self.compact.nickname, "cosy")
+        with self.assertRaises(AttributeError):
+            self.compact.missing
+
+    def test_to_dict(self):
+        """Test that both layouts serialize to the same record"""
+        self.assertEqual(self.compact.to_dict(), self.place.to_dict())
+        self.assertNotIn("number_rooms", self.compact.to_dict())
+
+    def test_undo_restores_slots(self):
+        """Test that an undo log puts slot and extra values back"""
+        undo = UndoLog()
+        undo.remember("Place.1", self.compact)
+        self.compact.name = "Changed"
+        self.compact.nickname = "new"
+        undo.restore()
+        self.assertEqual(self.compact.name, "Loft")
+        self.assertFalse(hasattr(self.compact, "nickname"))
+
+    def test_storage_builds_compact_objects(self):
+        """Test that compact_models makes the storage load compact objects"""
+        storage = FileStorage(file_path="test_file.json")
+        storage.new(self.place)
+        storage.new(User(id="2", created_at="2024-05-21T09:52:28.980961",
+                         updated_at="2024-05-21T09:52:28.980961"))
+        storage.save()
+        loaded = FileStorage(file_path="test_file.json", compact_models=True)
+        loaded.reload()
+        place = loaded.get(Place, "1")
+        self.assertIs(type(place), compact(Place))
+        self.assertIs(type(loaded.get(User, "2")), compact(User))
+        self.assertEqual(place.to_dict(), self.place.to_dict())
+        self.assertEqual(loaded.find(Place, name="Loft"), [place])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the binary snapshot format.
+"""
+import glob
+import io
+import json
+import os
+import pickle
+import unittest
+from datetime import datetime
+from models.base_model import BaseModel
+from models.engine import binary_format
+from models.engine.file_storage import FileStorage
+from models.user import User
+
+
+class TestBinaryFormat(unittest.TestCase):
+    """
+    Unit tests for the binary snapshot format.
+    """
+
+    def tearDown(self):
+        """Tear down test environment"""
+        for path in glob.glob("test_file.*"):
+            os.remove(path)
+
+    def test_dump_and_load(self):
+        """Test that records of different shapes survive a round trip"""
+        now = datetime(2024, 5, 17, 9, 30, 12, 123456)
+        records = [
+            ("User", {"id": "1", "created_at": now, "updated_at": now,
+                      "email": "a@b.c"}),
+            ("User", {"id": "2", "created_at": now.isoformat(),
+                      "updated_at": now, "__class__": "User"}),
+            ("Place", {"id": "3", "created_at": now, "updated_at": now,
+                       "amenity_ids": ["x"], "latitude": 1.5}),
+        ]
+        buffer = io.BytesIO()
+        binary_format.dump(records, buffer)
+        buffer.seek(0)
+        loaded = dict(binary_format.load(buffer))
+        self.assertEqual(set(loaded), {"User.1", "User.2", "Place.3"})
+        self.assertEqual(loaded["User.1"]["created_at"], now)
+        self.assertEqual(loaded["User.2"]["created_at"], now)
+        self.assertEqual(loaded["User.1"]["email"], "a@b.c")
+        self.assertNotIn("email", loaded["User.2"])
+        self.assertEqual(loaded["Place.3"]["amenity_ids"], ["x"])
+        self.assertEqual(loaded["Place.3"]["__class__"], "Place")
+
+    def test_rejects_globals(self):
+        """Test that a snapshot cannot make the loader import anything"""
+        buffer = io.BytesIO(binary_format.MAGIC
+                            + pickle.dumps((1, [("User", ("id",),
+                                                 [(datetime.now(),)])])))
+        with self.assertRaises(pickle.UnpicklingError):
+            list(binary_format.load(buffer))
+        with self.assertRaises(ValueError):
+            list(binary_format.load(io.BytesIO(b"{}")))
+
+    def test_dump_only_writes_builtin_types(self):
+        """Test that other datetimes become strings and other types fail"""
+        when = datetime(2024, 5, 17, 9, 30)
+        buffer = io.BytesIO()
+        binary_format.dump([("User", {"id": "1", "seen_at": when,
+                                      "visits": [when], "tags": ("a", 1)})],
+                           buffer)
+        buffer.seek(0)
+        record = dict(binary_format.load(buffer))["User.1"]
+        self.assertEqual(record["seen_at"], when.isoformat())
+        self.assertEqual(record["visits"], [when.isoformat()])
+        self.assertEqual(record["tags"], ("a", 1))
+        with self.assertRaises(TypeError):
+            binary_format.dump([("User", {"id": "1", "tags": {"a"}})],
+                               io.BytesIO())
+        storage = FileStorage(file_path="test_file.bin")
+        user = User(id="u1", created_at="2024-01-01T00:00:00",
+                    updated_at="2024-01-01T00:00:00")
+        user.seen_at = when
+        storage.new(user)
+        storage.save()
+        loaded = FileStorage(file_path="test_file.bin")
+        loaded.reload()
+        self.assertEqual(loaded.get(User, "u1").seen_at, when.isoformat())
+
+    def test_file_storage_round_trip(self):
+        """Test that a .bin file path makes FileStorage use the format"""
+        for lazy in (False, True):
+            storage = FileStorage(file_path="test_file.bin", lazy=lazy)
+            user = User(id="u1", created_at=datetime.now().isoformat(),
+                        updated_at=datetime.now().isoformat())
+            user.email = "a@b.c"
+            storage.new(user)
+            storage.new(BaseModel(id="b1", created_at="2024-01-01T00:00:00",
+                                  updated_at="2024-01-02T00:00:00"))
+            storage.save()
+            with open("test_file.bin", "rb") as f:
+                self.assertEqual(f.read(4), binary_format.MAGIC)
+            storage = FileStorage(file_path="test_file.bin", lazy=lazy)
+            storage.reload()
+            loaded = storage.get(User, "u1")
+            self.assertEqual(loaded.email, "a@b.c")
+            self.assertEqual(loaded.created_at, user.created_at)
+            self.assertEqual(storage.get(BaseModel, "b1").updated_at,
+                             datetime(2024, 1, 2))
+
+    def test_conversion(self):
+        """Test the JSON to binary and binary to JSON converters"""
+        snapshot = {"User.1": {"id": "1", "__class__": "User",
+                               "created_at": "2024-01-01T00:00:00.000001",
+                               "updated_at": "2024-01-01T00:00:00",
+                               "first_name": "Betty"}}
+        with open("test_file.json", "w") as f:
+            json.dump(snapshot, f)
+        binary_format.main(["to-binary", "test_file.json", "test_file.bin"])
+        binary_format.main(["to-json", "test_file.bin", "test_file.out"])
+        with open("test_file.out") as f:
+            self.assertEqual(json.load(f), snapshot)
+
+
+if __name__ == "__main__":
+    unittest.main()
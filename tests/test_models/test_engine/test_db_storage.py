@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the DBStorage class.
+"""
+import os
+import unittest
+from models.base_model import BaseModel
+from models.engine.db_storage import DBStorage
+from models.place import Place
+from models.review import Review
+
+
+class TestDBStorage(unittest.TestCase):
+    """
+    Unit tests for the DBStorage class.
+    """
+
+    def setUp(self):
+        """Set up test environment"""
+        self.storage = DBStorage("test_file.db")
+        self.storage.reload()
+
+    def tearDown(self):
+        """Tear down test environment"""
+        if os.path.exists("test_file.db"):
+            os.remove("test_file.db")
+
+    def test_new_save_and_reopen(self):
+        """Test that saved objects are read back by another connection"""
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.storage.save()
+        other = DBStorage("test_file.db")
+        other.reload()
+        key = f"BaseModel.{obj.id}"
+        self.assertIn(key, other.all())
+        self.assertEqual(other.get(BaseModel, obj.id).created_at,
+                         obj.created_at)
+
+    def test_bulk_insert(self):
+        """Test that bulk_insert commits every row at once"""
+        places = self.storage.bulk_insert(
+            Place, [{"name": f"Loft {i}", "price_by_night": str(i)}
+                    for i in range(5)])
+        self.assertFalse(any(self.storage.is_dirty(p) for p in places))
+        other = DBStorage("test_file.db")
+        other.reload()
+        self.assertEqual(other.count(Place), 5)
+        self.assertEqual(other.get(Place, places[3].id).price_by_night, 3)
+
+    def test_unsaved_changes_are_visible_but_not_committed(self):
+        """Test that reads see pending objects before save() commits them"""
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.assertEqual(self.storage.count(BaseModel), 1)
+        self.assertTrue(self.storage.is_dirty(obj))
+        other = DBStorage("test_file.db")
+        other.reload()
+        self.assertEqual(other.count(), 0)
+        self.storage.save()
+        self.assertFalse(self.storage.is_dirty(obj))
+
+    def test_get_count_and_delete(self):
+        """Test point reads, counts and deletion"""
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.storage.save()
+        self.assertIs(self.storage.get("BaseModel", obj.id), obj)
+        self.assertIsNone(self.storage.get(BaseModel, "missing"))
+        self.storage.delete(obj)
+        self.assertIsNone(self.storage.get(BaseModel, obj.id))
+        self.storage.save()
+        self.assertEqual(self.storage.count(BaseModel), 0)
+
+    def test_find_and_range(self):
+        """Test the indexed equality and range queries"""
+        review = Review()
+        review.place_id = "p1"
+        self.storage.new(review)
+        self.storage.new(Review())
+        self.assertEqual(self.storage.find(Review, place_id="p1"), [review])
+        self.assertEqual(len(self.storage.find(Review, place_id="")), 1)
+        cheap, pricey = Place(), Place()
+        cheap.price_by_night = 10
+        pricey.price_by_night = 90
+        for place in (cheap, pricey, Place()):
+            self.storage.new(place)
+        self.assertEqual(self.storage.range(Place, "price_by_night", 5, 50),
+                         [cheap])
+        self.assertEqual(len(self.storage.range(Place, "price_by_night",
+                                                hi=50)), 2)
+        self.assertIs(next(self.storage.ordered(Place, "price_by_night",
+                                                reverse=True)), pricey)
+
+    def test_batch(self):
+        """Test that a batch commits once and rolls back on error"""
+        kept = BaseModel()
+        self.storage.new(kept)
+        self.storage.save()
+        other = DBStorage("test_file.db")
+        with self.storage.batch():
+            added = BaseModel()
+            self.storage.new(added)
+            self.storage.save()
+            self.assertEqual(self.storage.count(), 2)
+            self.assertEqual(other.count(), 1)
+        self.assertEqual(other.count(), 2)
+        with self.assertRaises(ValueError):
+            with self.storage.batch():
+                self.storage.delete(kept)
+                self.storage.new(BaseModel())
+                self.assertEqual(self.storage.count(), 2)
+                raise ValueError
+        self.assertIs(self.storage.get(BaseModel, kept.id), kept)
+        self.assertEqual(self.storage.count(), 2)
+        self.storage.save()
+        self.assertEqual(other.count(), 2)
+
+    def test_lru_cache(self):
+        """Test that a bounded cache evicts, writes back and keeps identity"""
+        storage = DBStorage("test_file.db", cache_size=2)
+        storage.reload()
+        objs = [BaseModel(id=str(i), created_at="2024-05-21T09:52:28.980961",
+                          updated_at="2024-05-21T09:52:28.980961")
+                for i in range(3)]
+        for obj in objs:
+            storage.new(obj)
+        stats = storage.cache_stats()
+        self.assertEqual((stats["resident"], stats["evictions"]), (2, 1))
+        storage.save()
+        self.assertEqual(storage.count(), 3)
+        self.assertIs(storage.get(BaseModel, "0"), objs[0])
+        objs[1].name = "changed"
+        storage.mark_dirty(objs[1])
+        storage.new(BaseModel(id="3", created_at="2024-05-21T09:52:28.980961",
+                              updated_at="2024-05-21T09:52:28.980961"))
+        storage.save()
+        other = DBStorage("test_file.db")
+        self.assertEqual(other.get(BaseModel, "1").name, "changed")
+        del obj, objs
+        misses = storage.cache_stats()["misses"]
+        self.assertEqual(storage.get(BaseModel, "2").id, "2")
+        stats = storage.cache_stats()
+        self.assertEqual(stats["misses"], misses + 1)
+        self.assertLessEqual(stats["resident"], 2)
+        self.assertGreater(stats["hit_rate"], 0)
+        with self.assertRaises(ValueError):
+            DBStorage("test_file.db", cache_size=0)
+
+    def test_classes(self):
+        """Test the classes method"""
+        self.assertIn("Review", self.storage.classes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,19 @@
 """
 Unit tests for the FileStorage class.
 """
+import asyncio
 import unittest
+import glob
 import json
 import os
+import shutil
+import threading
 from models.base_model import BaseModel
-from models.engine.file_storage import FileStorage
+from io import StringIO
+from unittest.mock import patch
+from models.engine.columns import ColumnFile
+from models.engine.file_storage import FileStorage, _iter_records
+from models.engine.locks import ReadWriteLock
 
 class TestFileStorage(unittest.TestCase):
     """
@@ -15,19 +23,30 @@ class TestFileStorage(unittest.TestCase):
 
     def setUp(self):
         """Set up test environment"""
-        self.storage = FileStorage()
-        self.storage._FileStorage__file_path = "test_file.json"
-        self.storage._FileStorage__objects = {}
+        self.storage = FileStorage(file_path="test_file.json")
 
     def tearDown(self):
         """Tear down test environment"""
-        if os.path.exists("test_file.json"):
-            os.remove("test_file.json")
+        for path in glob.glob("test_file.json*"):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
 
     def test_all(self):
         """Test the all method"""
         self.assertEqual(self.storage.all(), {})
 
+    def test_all_is_read_only(self):
+        """Test that objects cannot be removed behind the class index"""
+        obj = BaseModel()
+        self.storage.new(obj)
+        key = f"BaseModel.{obj.id}"
+        with self.assertRaises(TypeError):
+            del self.storage.all()[key]
+        self.assertEqual(self.storage.count("BaseModel"), 1)
+        self.assertEqual(self.storage.all("BaseModel"), {key: obj})
+
     def test_new(self):
         """Test the new method"""
         obj = BaseModel()
@@ -50,7 +69,7 @@ class TestFileStorage(unittest.TestCase):
         obj = BaseModel()
         self.storage.new(obj)
         self.storage.save()
-        self.storage._FileStorage__objects = {}
+        self.storage = FileStorage(file_path="test_file.json")
         self.storage.reload()
         key = f"{obj.__class__.__name__}.{obj.id}"
         self.assertIn(key, self.storage.all())
@@ -71,6 +90,808 @@ class TestFileStorage(unittest.TestCase):
         self.assertIn("Place", classes)
         self.assertIn("Review", classes)
 
+    def test_journal_appends_instead_of_rewriting(self):
+        """Test that journal mode appends mutations to the log"""
+        storage = FileStorage(journal=True)
+        storage._FileStorage__file_path = "test_file.json"
+        obj = BaseModel()
+        storage.new(obj)
+        storage.save()
+        self.assertFalse(os.path.exists("test_file.json"))
+        with open("test_file.json.log", "r") as file:
+            record = json.loads(file.readline())
+        self.assertEqual(record["op"], "new")
+        self.assertEqual(record["value"]["id"], obj.id)
+
+    def test_journal_replay(self):
+        """Test that reload replays updates and destroys from the log"""
+        storage = FileStorage(journal=True)
+        storage._FileStorage__file_path = "test_file.json"
+        kept, gone = BaseModel(), BaseModel()
+        storage.new(kept)
+        storage.new(gone)
+        storage.save()
+        kept.name = "kept"
+        storage.mark_dirty(kept)
+        storage.delete(gone)
+        storage.save()
+        storage = FileStorage(file_path="test_file.json", journal=True)
+        storage.reload()
+        self.assertEqual(storage.all()[f"BaseModel.{kept.id}"].name, "kept")
+        self.assertNotIn(f"BaseModel.{gone.id}", storage.all())
+
+    def test_journal_compaction(self):
+        """Test that the log is folded into a snapshot past the threshold"""
+        storage = FileStorage(journal=True, compact_after=2)
+        storage._FileStorage__file_path = "test_file.json"
+        storage.new(BaseModel())
+        storage.new(BaseModel())
+        storage.save()
+        self.assertFalse(os.path.exists("test_file.json.log"))
+        with open("test_file.json", "r") as file:
+            self.assertEqual(len(json.load(file)), 2)
+
+    def test_dirty_tracking(self):
+        """Test that a changed object stays flagged until it is saved"""
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.storage.save()
+        self.assertFalse(self.storage.is_dirty(obj))
+        self.storage.mark_dirty(obj)
+        self.assertTrue(self.storage.is_dirty(obj))
+
+    def test_deleted_attribute_is_saved(self):
+        """Test that deleting an attribute marks the object dirty"""
+        with patch("models.base_model.storage", self.storage):
+            obj = BaseModel()
+            obj.first_name = "A"
+            obj.save()
+            self.assertFalse(self.storage.is_dirty(obj))
+            del obj.first_name
+            self.assertTrue(self.storage.is_dirty(obj))
+            self.storage.save()
+        with open("test_file.json", "r") as file:
+            self.assertNotIn("first_name",
+                             json.load(file)[f"BaseModel.{obj.id}"])
+
+    def test_save_without_changes_does_no_io(self):
+        """Test that a save with nothing pending leaves the file alone"""
+        self.storage.new(BaseModel())
+        self.storage.save()
+        os.remove("test_file.json")
+        self.storage.save()
+        self.assertFalse(os.path.exists("test_file.json"))
+
+    def test_save_reencodes_only_dirty_objects(self):
+        """Test that clean objects are written from their cached fragment"""
+        clean, dirty = BaseModel(), BaseModel()
+        self.storage.new(clean)
+        self.storage.new(dirty)
+        self.storage.save()
+        clean.name = "not reported"
+        dirty.name = "reported"
+        self.storage.mark_dirty(dirty)
+        self.storage.save()
+        with open("test_file.json", "r") as file:
+            obj_dict = json.load(file)
+        self.assertNotIn("name", obj_dict[f"BaseModel.{clean.id}"])
+        self.assertEqual(obj_dict[f"BaseModel.{dirty.id}"]["name"], "reported")
+
+    def test_atomic_save_leaves_no_temp_file(self):
+        """Test that a snapshot is renamed into place at every durability"""
+        for durability in ("none", "file", "dir"):
+            storage = FileStorage(file_path="test_file.json",
+                                  durability=durability)
+            storage.new(BaseModel())
+            storage.save()
+            self.assertEqual([name for name in os.listdir(".")
+                              if name.startswith("test_file.json.")], [])
+            with open("test_file.json", "r") as file:
+                self.assertEqual(len(json.load(file)), 1)
+
+    def test_failed_save_keeps_old_snapshot(self):
+        """Test that an error while encoding leaves the snapshot intact"""
+        self.storage.new(BaseModel())
+        self.storage.save()
+        with open("test_file.json", "r") as file:
+            before = file.read()
+        broken = BaseModel(id="broken",
+                           created_at="2024-05-21T09:52:28.980961",
+                           updated_at="2024-05-21T09:52:28.980961")
+        broken.to_dict = None
+        self.storage.new(broken)
+        with self.assertRaises(TypeError):
+            self.storage.save()
+        with open("test_file.json", "r") as file:
+            self.assertEqual(file.read(), before)
+
+    def test_unknown_durability(self):
+        """Test that an unknown durability level is rejected"""
+        with self.assertRaises(ValueError):
+            FileStorage(durability="sometimes")
+
+    def test_lazy_reload_keeps_raw_records(self):
+        """Test that lazy mode builds instances only on first access"""
+        first, second = BaseModel(), BaseModel()
+        self.storage.new(first)
+        self.storage.new(second)
+        self.storage.save()
+        storage = FileStorage(file_path="test_file.json", lazy=True)
+        storage.reload()
+        raw = storage._FileStorage__objects
+        self.assertEqual(storage.count(BaseModel), 2)
+        self.assertEqual(storage.count("User"), 0)
+        self.assertIsInstance(raw[f"BaseModel.{first.id}"], dict)
+        obj = storage.get(BaseModel, first.id)
+        self.assertIsInstance(obj, BaseModel)
+        self.assertEqual(obj.created_at, first.created_at)
+        self.assertIsInstance(raw[f"BaseModel.{second.id}"], dict)
+        self.assertIsNone(storage.get(BaseModel, "missing"))
+        for value in storage.all().values():
+            self.assertIsInstance(value, BaseModel)
+
+    def test_lazy_save_writes_raw_records(self):
+        """Test that records never accessed are saved unchanged"""
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.storage.save()
+        with open("test_file.json", "r") as file:
+            before = json.load(file)
+        storage = FileStorage(file_path="test_file.json", lazy=True)
+        storage.reload()
+        storage.new(BaseModel())
+        storage.save()
+        with open("test_file.json", "r") as file:
+            after = json.load(file)
+        key = f"BaseModel.{obj.id}"
+        self.assertEqual(after[key], before[key])
+        self.assertEqual(len(after), 2)
+
+    def test_iter_records_matches_json_load(self):
+        """Test the streaming loader against json.loads on small chunks"""
+        snapshot = {"BaseModel.1": {"id": "1", "tags": ["}", {"a": 'q"uote\\'}]},
+                    "BaseModel.2": {}}
+        for text in (json.dumps(snapshot), json.dumps(snapshot, indent=4)):
+            for chunk_size in (1, 5, 4096):
+                records = dict(_iter_records(StringIO(text), chunk_size))
+                self.assertEqual(records, snapshot)
+        self.assertEqual(list(_iter_records(StringIO(" { } "))), [])
+
+    def test_iter_records_rejects_garbage(self):
+        """Test that the streaming loader raises on a malformed snapshot"""
+        for text in ("", "[]", '{"a": {}', '{"a" {}}'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(_iter_records(StringIO(text), 2))
+
+    def test_all_and_count_by_class(self):
+        """Test the per-class index behind all(cls) and count(cls)"""
+        from models.user import User
+        user, base = User(), BaseModel()
+        self.storage.new(user)
+        self.storage.new(base)
+        self.assertEqual(self.storage.all(User), {f"User.{user.id}": user})
+        self.assertEqual(list(self.storage.all("BaseModel").values()), [base])
+        self.assertEqual(self.storage.count("User"), 1)
+        self.assertEqual(self.storage.count(), 2)
+        self.storage.delete(user)
+        self.assertEqual(self.storage.all(User), {})
+        self.assertEqual(self.storage.count(User), 0)
+        self.assertEqual(self.storage.count("State"), 0)
+
+    def test_reload_rebuilds_class_index(self):
+        """Test that reload() indexes the loaded objects"""
+        self.storage.new(BaseModel())
+        self.storage.save()
+        self.storage = FileStorage(file_path="test_file.json")
+        self.storage.reload()
+        self.assertEqual(self.storage.count(BaseModel), 1)
+
+    def test_instances_keep_their_own_objects(self):
+        """Test that storages on different files do not share objects"""
+        other = FileStorage(file_path="test_file.json.other")
+        self.storage.new(BaseModel())
+        self.assertEqual(other.count(), 0)
+        self.assertEqual(other.all(), {})
+        self.assertEqual(self.storage.count(), self.storage.count(BaseModel))
+
+    def test_find_uses_declared_indexes(self):
+        """Test find() on the hash indexes declared by the models"""
+        from models.review import Review
+        reviews = [Review(), Review(), Review()]
+        for review, place_id in zip(reviews, ("p1", "p1", "p2")):
+            review.place_id = place_id
+            review.user_id = "u1"
+            self.storage.new(review)
+        self.assertEqual(self.storage.find(Review, place_id="p1"),
+                         reviews[:2])
+        self.assertEqual(self.storage.find("Review", place_id="p2",
+                                           user_id="u1"), reviews[2:])
+        self.assertEqual(self.storage.find(Review, place_id="nope"), [])
+
+    def test_index_follows_attribute_updates(self):
+        """Test that updating or deleting an indexed object moves its key"""
+        from models.city import City
+        city = City()
+        city.state_id = "old"
+        self.storage.new(city)
+        self.assertEqual(self.storage.find(City, state_id="old"), [city])
+        city.state_id = "new"
+        self.storage.mark_dirty(city, "state_id")
+        self.assertEqual(self.storage.find(City, state_id="old"), [])
+        self.assertEqual(self.storage.find(City, state_id="new"), [city])
+        self.storage.delete(city)
+        self.assertEqual(self.storage.find(City, state_id="new"), [])
+
+    def test_reload_fills_indexes_on_first_query(self):
+        """Test that reload() leaves the indexes empty until a query"""
+        from models.review import Review
+        review = Review()
+        review.place_id = "p1"
+        self.storage.new(review)
+        self.storage.save()
+        storage = FileStorage(file_path="test_file.json")
+        storage.reload()
+        self.assertEqual(storage._FileStorage__filled, set())
+        self.assertEqual([obj.id for obj in storage.find(Review,
+                                                         place_id="p1")],
+                         [review.id])
+        self.assertEqual(storage._FileStorage__filled, {"Review"})
+
+    def test_add_index(self):
+        """Test declaring an index at runtime on existing objects"""
+        obj = BaseModel()
+        obj.name = "indexed"
+        self.storage.new(obj)
+        index = self.storage.add_index(BaseModel, "name")
+        self.assertEqual(list(index.lookup("indexed")),
+                         [f"BaseModel.{obj.id}"])
+        self.assertIs(self.storage.add_index("BaseModel", "name"), index)
+
+    def test_range_and_ordered(self):
+        """Test range queries and ordered iteration on Place prices"""
+        from itertools import islice
+        from models.place import Place
+        places = []
+        for price in (120, 40, 80, 80, 300):
+            place = Place()
+            place.price_by_night = price
+            self.storage.new(place)
+            places.append(place)
+        prices = [p.price_by_night
+                  for p in self.storage.range(Place, "price_by_night", 50, 120)]
+        self.assertEqual(prices, [80, 80, 120])
+        self.assertEqual(len(self.storage.range(Place, "price_by_night",
+                                                hi=80)), 3)
+        cheapest = islice(self.storage.ordered(Place, "price_by_night"), 2)
+        self.assertEqual([p.price_by_night for p in cheapest], [40, 80])
+        top = next(self.storage.ordered(Place, "price_by_night", True))
+        self.assertIs(top, places[4])
+
+    def test_range_index_fill(self):
+        """Test that a range index filled at once keeps its entries sorted"""
+        from models.engine.indexes import RangeIndex
+        index = RangeIndex("price")
+        index.fill([("Place.c", 80), ("Place.a", "free"), ("Place.b", 40),
+                    ("Place.d", float("nan")), ("Place.e", 80)])
+        self.assertEqual(index.range(), ["Place.b", "Place.c", "Place.e"])
+        index.update("Place.b", 90)
+        index.remove("Place.c")
+        self.assertEqual(list(index.ordered()), ["Place.e", "Place.b"])
+
+    def test_range_index_is_incremental(self):
+        """Test that updates and deletes move entries of a range index"""
+        from models.place import Place
+        place = Place()
+        place.max_guest = 2
+        self.storage.new(place)
+        place.max_guest = 6
+        self.storage.mark_dirty(place, "max_guest")
+        self.assertEqual(self.storage.range(Place, "max_guest", 0, 4), [])
+        self.assertEqual(self.storage.range(Place, "max_guest", 5, 6), [place])
+        self.assertEqual(self.storage.find(Place, max_guest=6), [place])
+        place.max_guest = "lots"
+        self.storage.mark_dirty(place, "max_guest")
+        self.assertEqual(self.storage.range(Place, "max_guest"), [])
+        place.max_guest = 3
+        self.storage.mark_dirty(place, "max_guest")
+        self.storage.delete(place)
+        self.assertEqual(self.storage.range(Place, "max_guest"), [])
+
+    def test_spatial_queries(self):
+        """Test radius, bounding-box and nearest queries on Place"""
+        from models.place import Place
+        coordinates = {"lagos": (6.5244, 3.3792), "ikeja": (6.6018, 3.3515),
+                       "abuja": (9.0765, 7.3986), "accra": (5.6037, -0.1870)}
+        places = {}
+        for name, (latitude, longitude) in coordinates.items():
+            place = Place()
+            place.name = name
+            place.latitude, place.longitude = latitude, longitude
+            self.storage.new(place)
+            places[name] = place
+        near = self.storage.within_radius(Place, 6.5244, 3.3792, 15)
+        self.assertEqual([place.name for _, place in near], ["lagos", "ikeja"])
+        self.assertLess(near[1][0], 15)
+        box = self.storage.within_box(Place, 5, -1, 7, 4)
+        self.assertEqual(sorted(place.name for place in box),
+                         ["accra", "ikeja", "lagos"])
+        # west and east in the same cell, the box wraps round the globe
+        box = self.storage.within_box(Place, -80, 50.05, 80, 50.02)
+        self.assertEqual(sorted(place.name for place in box),
+                         ["abuja", "accra", "ikeja", "lagos"])
+        nearest = self.storage.nearest(Place, 9.0, 7.0, 2)
+        self.assertEqual([place.name for _, place in nearest],
+                         ["abuja", "ikeja"])
+        # far from every point: the search moves to the occupied cells
+        nearest = self.storage.nearest(Place, 48.85, 2.35, 2)
+        self.assertEqual([place.name for _, place in nearest],
+                         ["abuja", "ikeja"])
+        places["abuja"].latitude = -6.52
+        self.storage.mark_dirty(places["abuja"], "latitude")
+        self.assertEqual(self.storage.nearest(Place, 9.0, 7.0)[0][1].name,
+                         "ikeja")
+
+    def sharded_storage(self, shards=1):
+        """Returns an empty sharded storage on test_file.json"""
+        storage = FileStorage(file_path="test_file.json", shards=shards)
+        storage.reload()
+        return storage
+
+    def test_sharded_save_rewrites_dirty_shards(self):
+        """Test that a save only rewrites the shards of changed objects"""
+        from models.user import User
+        storage = self.sharded_storage()
+        user, base = User(), BaseModel()
+        storage.new(user)
+        storage.new(base)
+        storage.save()
+        self.assertEqual(sorted(os.listdir("test_file.json.d")),
+                         ["BaseModel.json", "User.json"])
+        os.remove("test_file.json.d/BaseModel.json")
+        storage.mark_dirty(user)
+        storage.save()
+        self.assertEqual(os.listdir("test_file.json.d"), ["User.json"])
+        storage.delete(user)
+        storage.save()
+        self.assertEqual(os.listdir("test_file.json.d"), [])
+
+    def test_sharded_reload_loads_classes_on_demand(self):
+        """Test that reload() reads a class shard only when it is used"""
+        from models.user import User
+        storage = self.sharded_storage(shards=4)
+        users = [User() for _ in range(8)]
+        for user in users:
+            storage.new(user)
+        storage.new(BaseModel())
+        storage.save()
+        self.assertTrue(all(name.startswith(("User.", "BaseModel."))
+                            and name.count(".") == 2
+                            for name in os.listdir("test_file.json.d")))
+        storage = self.sharded_storage(shards=4)
+        self.assertEqual(len(storage._FileStorage__objects), 0)
+        self.assertEqual(storage.count(User), 8)
+        self.assertEqual(len(storage._FileStorage__objects), 8)
+        self.assertEqual(storage.get(User, users[3].id).id, users[3].id)
+        self.assertEqual(storage.count(), 9)
+
+    def test_sharded_migrates_single_file(self):
+        """Test that a single-file store is split into shards on first start"""
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.storage.save()
+        storage = self.sharded_storage()
+        self.assertFalse(os.path.exists("test_file.json"))
+        self.assertTrue(os.path.exists("test_file.json.migrated"))
+        self.assertTrue(os.path.exists("test_file.json.d/BaseModel.json"))
+        self.assertIsNotNone(storage.get(BaseModel, obj.id))
+
+    def test_sharded_bucket_count_change(self):
+        """Test that shards written with another bucket count are replaced"""
+        storage = self.sharded_storage(shards=3)
+        objs = [BaseModel() for _ in range(6)]
+        for obj in objs:
+            storage.new(obj)
+        storage.save()
+        storage = self.sharded_storage(shards=1)
+        storage.delete(storage.get(BaseModel, objs[0].id))
+        storage.save()
+        self.assertEqual(os.listdir("test_file.json.d"), ["BaseModel.json"])
+        storage = self.sharded_storage(shards=1)
+        self.assertEqual(storage.count(BaseModel), 5)
+
+    def test_compressed_snapshots(self):
+        """Test that snapshots are compressed by extension or by setting"""
+        cases = [("test_file.json.gz", None, b"\x1f\x8b"),
+                 ("test_file.json.xz", None, b"\xfd7zXZ\x00"),
+                 ("test_file.json.bin.gz", None, b"\x1f\x8b"),
+                 ("test_file.json", "lzma", b"\xfd7zXZ\x00"),
+                 ("test_file.json.gz", "none", b"{")]
+        for path, compression, magic in cases:
+            storage = FileStorage(file_path=path, compression=compression,
+                                  compress_level=1)
+            obj = BaseModel()
+            storage.new(obj)
+            storage.save()
+            with open(path, "rb") as file:
+                self.assertTrue(file.read().startswith(magic))
+            storage = FileStorage(file_path=path, compression=compression)
+            storage.reload()
+            self.assertEqual(storage.get(BaseModel, obj.id).created_at,
+                             obj.created_at)
+            # the content, not the setting, decides how a file is read
+            other = FileStorage(file_path=path)
+            other.reload()
+            self.assertEqual(other.count(), 1)
+            os.remove(path)
+        with self.assertRaises(ValueError):
+            FileStorage(compression="bzip2")
+
+    def test_columns_follow_saves(self):
+        """Test that the Place side file is rewritten by columns() after a save"""
+        from models.place import Place
+        cheap, pricey, odd = Place(), Place(), Place()
+        cheap.price_by_night, cheap.latitude = 20, 10.0
+        pricey.price_by_night, pricey.latitude = 100, 20.0
+        odd.price_by_night, odd.latitude = "free", "north"
+        for place in (cheap, pricey, odd):
+            self.storage.new(place)
+        self.storage.save()
+        self.assertFalse(os.path.exists("test_file.json.Place.cols"))
+        with self.storage.columns(Place) as columns:
+            self.assertEqual(columns.rows, 3)
+            self.assertEqual(columns.stats("price_by_night"),
+                             {"count": 2, "sum": 120, "min": 20, "max": 100,
+                              "mean": 60})
+            self.assertEqual(columns.stats("latitude")["max"], 20.0)
+            self.assertEqual(columns.stats("max_guest")["count"], 3)
+        pricey.price_by_night = 40
+        self.storage.delete(cheap)
+        self.storage.save()
+        with ColumnFile("test_file.json.Place.cols") as columns:
+            self.assertEqual(columns.rows, 3)
+        with self.storage.columns("Place") as columns:
+            self.assertEqual(list(columns.values("price_by_night")), [40])
+        with self.assertRaises(ValueError):
+            self.storage.columns(BaseModel)
+
+    def test_columns_do_not_build_instances(self):
+        """Test that a lazy store answers aggregates from the side file"""
+        from models.place import Place
+        for price in (10, 30):
+            place = Place()
+            place.price_by_night = price
+            self.storage.new(place)
+        self.storage.save()
+        storage = FileStorage(file_path="test_file.json", lazy=True)
+        storage.reload()
+        with storage.columns(Place) as columns:
+            self.assertEqual(columns.stats("price_by_night")["mean"], 20)
+        raw = storage._FileStorage__objects
+        self.assertTrue(all(type(value) is dict for value in raw.values()))
+
+    def test_batch_saves_once(self):
+        """Test that saves inside a batch are deferred to its end"""
+        with self.storage.batch():
+            first = BaseModel()
+            self.storage.new(first)
+            self.storage.save()
+            second = BaseModel()
+            self.storage.new(second)
+            second.name = "second"
+            self.storage.mark_dirty(second, "name")
+            self.storage.save()
+            self.assertFalse(os.path.exists("test_file.json"))
+            self.assertTrue(self.storage.is_dirty(second))
+        with open("test_file.json", "r") as file:
+            saved = json.load(file)
+        self.assertIn(f"BaseModel.{first.id}", saved)
+        self.assertEqual(saved[f"BaseModel.{second.id}"]["name"], "second")
+        self.assertFalse(self.storage.is_dirty(second))
+
+    def test_bulk_insert(self):
+        """Test that bulk_insert registers every row and writes the file once"""
+        with patch("models.engine.file_storage._atomic_write") as write:
+            users = self.storage.bulk_insert(
+                "User", [{"email": f"{i}@hbnb.io"} for i in range(3)]
+                + [{"id": "fixed", "first_name": 42}])
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(len({user.id for user in users}), 4)
+        self.assertEqual(self.storage.count("User"), 4)
+        self.assertEqual(self.storage.get("User", "fixed").first_name, "42")
+        self.assertEqual(users[0].created_at, users[-1].created_at)
+        with self.assertRaises(ValueError):
+            self.storage.bulk_insert("User", [{"email": "x"}, {"{bad": 1}])
+        self.assertEqual(self.storage.count("User"), 4)
+
+    def test_batch_rolls_back_on_error(self):
+        """Test that an exception undoes the changes made in a batch"""
+        kept, gone = BaseModel(), BaseModel()
+        kept.name = "before"
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        with open("test_file.json", "r") as file:
+            before = file.read()
+        with self.assertRaises(KeyError):
+            with self.storage.batch():
+                # what the attribute hook does for the storage in use
+                self.storage.snapshot(kept)
+                kept.name = "after"
+                self.storage.mark_dirty(kept, "name")
+                self.storage.save()
+                self.storage.delete(gone)
+                added = BaseModel()
+                self.storage.new(added)
+                with self.storage.batch():
+                    raise KeyError("boom")
+        with open("test_file.json", "r") as file:
+            self.assertEqual(file.read(), before)
+        self.assertEqual(kept.name, "before")
+        self.assertFalse(self.storage.is_dirty(kept))
+        self.assertIs(self.storage.get(BaseModel, gone.id), gone)
+        self.assertIsNone(self.storage.get(BaseModel, added.id))
+        self.assertFalse(self.storage.batching)
+
+    def test_batch_belongs_to_its_thread(self):
+        """Test that a batch neither defers nor rolls back other threads"""
+        storage = FileStorage(file_path="test_file.json", thread_safe=True)
+        stamp = "2024-05-21T09:52:28.980961"
+        mine, other = [BaseModel(id=obj_id, created_at=stamp,
+                                 updated_at=stamp)
+                       for obj_id in ("mine", "other")]
+        entered, saved = threading.Event(), threading.Event()
+        seen = []
+
+        def writer():
+            entered.wait()
+            seen.append(storage.batching)
+            storage.new(other)
+            storage.save()
+            saved.set()
+        thread = threading.Thread(target=writer)
+        thread.start()
+        with self.assertRaises(KeyError):
+            with storage.batch():
+                storage.new(mine)
+                entered.set()
+                saved.wait()
+                raise KeyError("boom")
+        thread.join()
+        self.assertEqual(seen, [False])
+        self.assertIs(storage.get(BaseModel, "other"), other)
+        self.assertIsNone(storage.get(BaseModel, "mine"))
+        # the other thread's save wrote the object the rollback removed
+        self.assertTrue(storage.is_dirty(mine))
+        storage.save()
+        with open("test_file.json", "r") as file:
+            self.assertEqual(list(json.load(file)), ["BaseModel.other"])
+
+    def test_group_commit_merges_saves(self):
+        """Test that close saves are written once by the background writer"""
+        storage = FileStorage(file_path="test_file.json", group_commit=0.05)
+        objs = [BaseModel() for _ in range(10)]
+        for obj in objs:
+            storage.new(obj)
+            storage.save()
+        storage.flush()
+        with open("test_file.json", "r") as file:
+            self.assertEqual(len(json.load(file)), 10)
+        stats = storage.commit_stats()
+        self.assertEqual(stats["requests"], 10)
+        self.assertLess(stats["writes"], 10)
+        self.assertEqual(stats["merged"], 10 - stats["writes"])
+        storage.delete(objs[0])
+        storage.save()
+        storage.close()
+        self.assertIsNone(storage.commit_stats())
+        with open("test_file.json", "r") as file:
+            self.assertEqual(len(json.load(file)), 9)
+
+    def test_group_commit_reports_errors(self):
+        """Test that flush() raises the error of a failed background write"""
+        storage = FileStorage(file_path="test_file.json", group_commit=0)
+        broken = BaseModel(id="broken",
+                           created_at="2024-05-21T09:52:28.980961",
+                           updated_at="2024-05-21T09:52:28.980961")
+        broken.to_dict = None
+        storage.new(broken)
+        storage.save()
+        with self.assertRaises(TypeError):
+            storage.flush()
+        storage.delete(broken)
+        storage.save()
+        storage.close()
+        with open("test_file.json", "r") as file:
+            self.assertEqual(json.load(file), {})
+
+    def test_read_write_lock(self):
+        """Test that readers share the lock and a writer waits for them"""
+        lock = ReadWriteLock()
+        inside, release = threading.Barrier(3), threading.Event()
+        order = []
+
+        def read():
+            with lock.read():
+                inside.wait(1)
+                release.wait(1)
+                order.append("read")
+
+        def write():
+            with lock.write():
+                order.append("write")
+
+        readers = [threading.Thread(target=read) for _ in range(2)]
+        for thread in readers:
+            thread.start()
+        inside.wait(1)
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join(0.05)
+        self.assertEqual(order, [])
+        release.set()
+        for thread in readers + [writer]:
+            thread.join()
+        self.assertEqual(order, ["read", "read", "write"])
+        with lock.read():
+            with self.assertRaises(RuntimeError):
+                with lock.write():
+                    pass
+
+    def test_thread_safe_stress(self):
+        """Test concurrent adds, saves and queries on a thread-safe storage"""
+        storage = FileStorage(file_path="test_file.json", thread_safe=True)
+        errors = []
+
+        def add(start):
+            try:
+                for i in range(start, start + 200):
+                    storage.new(BaseModel(
+                        id=str(i), created_at="2024-05-21T09:52:28.980961",
+                        updated_at="2024-05-21T09:52:28.980961"))
+                    if i % 20 == 0:
+                        storage.save()
+            except Exception as exc:
+                errors.append(exc)
+
+        def query():
+            try:
+                for _ in range(50):
+                    objs = storage.all(BaseModel)
+                    self.assertLessEqual(len(objs), storage.count())
+                    for obj in list(objs.values())[-10:]:
+                        self.assertIs(storage.get(BaseModel, obj.id), obj)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=add, args=(start,))
+                   for start in range(0, 800, 200)]
+        threads += [threading.Thread(target=query) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        storage.save()
+        other = FileStorage(file_path="test_file.json")
+        other.reload()
+        self.assertEqual(other.count(BaseModel), 800)
+
+    def test_refresh_reads_journal_delta(self):
+        """Test that refresh() loads what another process appended"""
+        writer = FileStorage(file_path="test_file.json", journal=True,
+                             shared=True)
+        reader = FileStorage(file_path="test_file.json", journal=True,
+                             shared=True)
+        for storage in (writer, reader):
+            storage.reload()
+        self.assertFalse(reader.refresh())
+        kept, changed = [BaseModel(id=str(i),
+                                   created_at="2024-05-21T09:52:28.980961",
+                                   updated_at="2024-05-21T09:52:28.980961")
+                         for i in range(2)]
+        writer.new(kept)
+        writer.new(changed)
+        writer.save()
+        self.assertTrue(reader.refresh())
+        self.assertFalse(reader.refresh())
+        loaded = reader.get(BaseModel, "0")
+        self.assertEqual(reader.count(BaseModel), 2)
+        changed.name = "new"
+        changed.updated_at = changed.updated_at.replace(year=2025)
+        writer.mark_dirty(changed)
+        writer.save()
+        offset = reader._FileStorage__log_offset
+        self.assertTrue(reader.refresh())
+        self.assertGreater(reader._FileStorage__log_offset, offset)
+        self.assertIs(reader.get(BaseModel, "0"), loaded)
+        self.assertEqual(reader.get(BaseModel, "1").name, "new")
+        writer.delete(kept)
+        writer.compact()
+        self.assertTrue(reader.refresh())
+        self.assertIsNone(reader.get(BaseModel, "0"))
+        self.assertEqual(reader.count(BaseModel), 1)
+
+    def test_shared_save_merges_other_processes(self):
+        """Test that a shared save keeps what another process saved"""
+        first = FileStorage(file_path="test_file.json", shared=True)
+        second = FileStorage(file_path="test_file.json", shared=True)
+        for storage in (first, second):
+            storage.reload()
+        for storage, obj_id in ((first, "a"), (second, "b")):
+            storage.new(BaseModel(id=obj_id,
+                                  created_at="2024-05-21T09:52:28.980961",
+                                  updated_at="2024-05-21T09:52:28.980961"))
+            storage.save()
+        with open("test_file.json", "r") as file:
+            self.assertEqual(sorted(json.load(file)),
+                             ["BaseModel.a", "BaseModel.b"])
+        self.assertIsNotNone(second.get(BaseModel, "a"))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork()")
+    def test_shared_saves_from_processes(self):
+        """Test that processes saving the same store lose no object"""
+        pids = []
+        for worker in range(4):
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    storage = FileStorage(file_path="test_file.json",
+                                          shared=True)
+                    storage.reload()
+                    for i in range(25):
+                        storage.new(BaseModel(
+                            id=f"{worker}-{i}",
+                            created_at="2024-05-21T09:52:28.980961",
+                            updated_at="2024-05-21T09:52:28.980961"))
+                        storage.save()
+                except BaseException:
+                    code = 1
+                os._exit(code)
+            pids.append(pid)
+        for pid in pids:
+            self.assertEqual(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]),
+                             0)
+        storage = FileStorage(file_path="test_file.json")
+        storage.reload()
+        self.assertEqual(storage.count(BaseModel), 100)
+
+    def test_asave_merges_awaiters(self):
+        """Test that concurrent asave() calls share their writes"""
+        storage = FileStorage(file_path="test_file.json")
+        objs = [BaseModel(id=str(i), created_at="2024-05-21T09:52:28.980961",
+                          updated_at="2024-05-21T09:52:28.980961")
+                for i in range(20)]
+
+        async def request(obj):
+            storage.new(obj)
+            await storage.asave()
+
+        async def main():
+            await asyncio.gather(*(request(obj) for obj in objs))
+
+        asyncio.run(main())
+        stats = storage.async_stats()
+        self.assertEqual(stats["requests"], 20)
+        self.assertLessEqual(stats["writes"], 2)
+        with open("test_file.json", "r") as file:
+            self.assertEqual(len(json.load(file)), 20)
+
+    def test_areload_and_aall(self):
+        """Test async reload and iteration over the objects of a class"""
+        for i in range(5):
+            self.storage.new(BaseModel(id=str(i),
+                                       created_at="2024-05-21T09:52:28.980961",
+                                       updated_at="2024-05-21T09:52:28.980961"))
+        self.storage.save()
+        storage = FileStorage(file_path="test_file.json", shards=1)
+
+        async def main():
+            await storage.areload()
+            return [obj.id async for obj in storage.aall(BaseModel, chunk=2)]
+
+        self.assertEqual(sorted(asyncio.run(main())), [str(i) for i in range(5)])
+
 if __name__ == "__main__":
     unittest.main()
 
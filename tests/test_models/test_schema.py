@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Module for testing the typed attribute schemas.
+"""
+
+import json
+import os
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from console import HBNBCommand
+from models.compact import compact
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.schema import Schema, schema
+from models.user import User
+
+
+class TestSchema(unittest.TestCase):
+    """
+    Test cases for the schemas and their use by the models and console.
+    """
+
+    def test_fields(self):
+        """Test that the annotations of the class and its bases are compiled"""
+        fields = schema(Place).fields
+        self.assertIs(fields["number_rooms"], int)
+        self.assertIs(fields["latitude"], float)
+        self.assertIs(fields["amenity_ids"], list)
+        self.assertIs(fields["id"], str)
+        self.assertIs(schema(Place), schema(Place))
+        self.assertEqual(schema(compact(Place)).fields, fields)
+        with self.assertRaises(TypeError):
+            Schema({"when": object})
+
+    def test_coerce(self):
+        """Test the conversions and the rejected values"""
+        place = schema(Place)
+        self.assertEqual(place.coerce("number_rooms", "3"), 3)
+        self.assertEqual(place.coerce("number_rooms", 4.0), 4)
+        self.assertEqual(place.coerce("latitude", "-6.5"), -6.5)
+        self.assertEqual(place.coerce("latitude", 2), 2.0)
+        self.assertEqual(place.coerce("name", 12), "12")
+        self.assertEqual(place.coerce("amenity_ids", '["a"]'), ["a"])
+        self.assertEqual(place.coerce("unknown", {"x": 1}), {"x": 1})
+        for name, value in (("number_rooms", "3.5"), ("number_rooms", True),
+                            ("latitude", "north"), ("latitude", "nan"),
+                            ("name", None), ("amenity_ids", "a"),
+                            ("{'first_name':", "x")):
+            with self.assertRaises(ValueError):
+                place.coerce(name, value)
+
+    def test_constructor(self):
+        """Test that the kwargs constructor coerces and rejects records"""
+        record = {"id": "1", "created_at": "2024-05-21T09:52:28.980961",
+                  "updated_at": "2024-05-21T09:52:28.980961",
+                  "number_rooms": "2", "__class__": "Place"}
+        self.assertEqual(Place(**record).number_rooms, 2)
+        self.assertEqual(compact(Place)(**record).number_rooms, 2)
+        with self.assertRaises(ValueError):
+            Place(**dict(record, max_guest="many"))
+        with self.assertRaises(ValueError):
+            User(**dict(record, **{"{'first_name':": '"Hary'}))
+
+    def test_storage_loads_rejected_records(self):
+        """Test that a stored record failing its schema is loaded as it is"""
+        record = {"id": "1", "created_at": "2024-05-21T09:52:28.980961",
+                  "updated_at": "2024-05-21T09:52:28.980961",
+                  "max_guest": "lots", "__class__": "Place"}
+        with open("test_file.json", "w") as f:
+            json.dump({"Place.1": record}, f)
+        try:
+            storage = FileStorage(file_path="test_file.json")
+            storage.reload()
+        finally:
+            os.remove("test_file.json")
+        place = storage.get(Place, "1")
+        self.assertEqual(place.max_guest, "lots")
+        self.assertEqual(place.created_at.year, 2024)
+        self.assertEqual(place.to_dict(), record)
+
+    def test_console_update(self):
+        """Test that the console converts declared fields and rejects garbage"""
+        place = Place()
+        console = HBNBCommand()
+        with patch('sys.stdout', new=StringIO()) as f:
+            console.onecmd(f"update Place {place.id} name 42")
+            console.onecmd(f"update Place {place.id} latitude 1.5")
+            console.onecmd(f"update Place {place.id} number_rooms lots")
+            self.assertIn("invalid int for number_rooms", f.getvalue())
+        self.assertEqual(place.name, "42")
+        self.assertEqual(place.latitude, 1.5)
+        self.assertEqual(place.number_rooms, 0)
+        with patch('sys.stdout', new=StringIO()) as f:
+            console.onecmd(f'update Place {place.id} '
+                           '{"max_guest": 3, "price_by_night": "free"}')
+            self.assertIn("invalid int for price_by_night", f.getvalue())
+        self.assertEqual(place.max_guest, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Module for testing the epoch timestamps of the models.
+"""
+
+import os
+import unittest
+from datetime import datetime, timedelta
+from models import timestamps
+from models.base_model import BaseModel, Model
+from models.compact import compact
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+class TestTimestamps(unittest.TestCase):
+    """
+    Test cases for the raw created_at/updated_at values.
+    """
+
+    def setUp(self):
+        """Turns epoch timestamps on"""
+        self.was_enabled = timestamps.enabled()
+        timestamps.enable()
+        self.record = {"id": "1", "created_at": "2024-05-21T09:52:28.980961",
+                       "updated_at": "2024-05-21T09:52:28",
+                       "name": "Loft", "__class__": "Place"}
+
+    def tearDown(self):
+        """Restores the previous setting and removes the test files"""
+        timestamps.enable(self.was_enabled)
+        for path in ("test_file.json", "test_file.json.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_conversions(self):
+        """Test that epoch microseconds convert like datetime.now()"""
+        before = datetime.now()
+        value = timestamps.now()
+        self.assertIs(type(value), int)
+        moment = timestamps.to_datetime(value)
+        self.assertLess(abs(moment - before), timedelta(seconds=1))
+        self.assertEqual(timestamps.isoformat(value), moment.isoformat())
+        whole = value - value % 1000000
+        self.assertEqual(timestamps.isoformat(whole),
+                         timestamps.to_datetime(whole).isoformat())
+        self.assertEqual(timestamps.isoformat(moment), moment.isoformat())
+
+    def test_loaded_strings_kept_until_read(self):
+        """Test that ISO strings are stored as they are and parsed on read"""
+        for cls in (Place, compact(Place)):
+            place = cls(**self.record)
+            self.assertEqual(place._state()["created_at"],
+                             self.record["created_at"])
+            self.assertEqual(place.to_dict(), self.record)
+            self.assertEqual(place.updated_at, datetime(2024, 5, 21, 9, 52, 28))
+            self.assertIs(type(place._state()["updated_at"]), datetime)
+            self.assertEqual(place.to_dict(), self.record)
+
+    def test_new_instance_holds_micros(self):
+        """Test that a new instance stores epoch microseconds"""
+        obj = BaseModel()
+        self.assertIs(type(obj._state()["created_at"]), int)
+        self.assertIs(type(obj.created_at), datetime)
+        self.assertEqual(obj.to_dict()["updated_at"], obj.updated_at.isoformat())
+        self.assertEqual(str(obj), f"[BaseModel] ({obj.id}) {obj._state()}")
+
+    def test_disable_restores_attributes(self):
+        """Test that turning the option off removes the descriptors"""
+        timestamps.enable(False)
+        self.assertNotIn("created_at", vars(Model))
+        place = compact(Place)(**self.record)
+        self.assertIs(type(place.created_at), datetime)
+        timestamps.enable()
+        self.assertIsInstance(vars(Model)["created_at"], timestamps.Timestamp)
+
+    def test_binary_snapshot_round_trip(self):
+        """Test that a binary snapshot keeps epoch microseconds raw"""
+        path = "test_file.json"
+        storage = FileStorage(file_path=path + ".bin")
+        obj = BaseModel(id="2", created_at=timestamps.now(),
+                        updated_at=self.record["updated_at"])
+        storage.new(obj)
+        storage.save()
+        loaded = FileStorage(file_path=path + ".bin")
+        loaded.reload()
+        os.remove(path + ".bin")
+        copy = loaded.get(BaseModel, "2")
+        self.assertIs(type(copy._state()["created_at"]), int)
+        self.assertEqual(copy.to_dict(), obj.to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()